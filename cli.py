@@ -15,6 +15,7 @@ Example:
 
 import traceback
 import argparse
+import fnmatch
 from pathlib import Path
 import sys
 import rich
@@ -25,6 +26,7 @@ import logging
 
 from core import exceptions
 from core.servers import ServerManager, KherimoyaServer
+from core.cache import endstone_version
 
 try:
     import endstone
@@ -37,20 +39,40 @@ if not Path(PROJECT_PATH / "core").is_dir():
         sys.path.append(str(PROJECT_PATH.parent))
         from core.servers import ServerManager, KherimoyaServer
         from core.constants import DELIMITER
+        from core.pool import WarmPool
     except ImportError:
         raise ImportError("core/ module not found. Ensure this script is run from the project root or the file structure is correct.")
 else:
     from core.servers import ServerManager, KherimoyaServer
     from core.constants import DELIMITER
+    from core.pool import WarmPool
 
 def _get_server_by_id(server_manager, server_id) -> KherimoyaServer:
-    """Raises error if no server found"""
+    """Accepts full IDs or unique ID prefixes. Raises error if no server (or more than one) is found"""
     if server_id is None:
         raise exceptions.InvalidParameterError("Server ID must be provided!")
-    server = server_manager.get_server_by_id(server_id)
-    if not server:
-        raise exceptions.ServerDoesNotExistError("Server doesn't exist!")
-    return server
+    return server_manager.resolve_server(server_id, match_names=False)
+
+def _filter_servers(server_manager, pattern) -> list[KherimoyaServer] | None:
+    """Servers whose name matches a shell-style pattern, or None (meaning every server) without a pattern"""
+    if pattern is None:
+        return None
+    return [s for s in server_manager.list_server_objects() if fnmatch.fnmatchcase(s.name, pattern)]
+
+def _given(**options) -> dict:
+    """The options which were given on the command line, so the API's own defaults apply to the others"""
+    return {key: value for key, value in options.items() if value is not None}
+
+def _describe_stop(stop) -> str:
+    how = f"after {stop.signal}" if stop.signal else "cleanly"
+    return f"exit status {stop.exit_status}, {how}, {stop.seconds:.1f}s"
+
+def _print_bulk_results(done, action, results) -> None:
+    for result in results:
+        if result.ok:
+            print(f"{done} server: {result.result.name}{DELIMITER}{result.result.server_id} ({result.seconds:.1f}s)")
+        else:
+            print(f"Failed to {action} server {result.target}: {result.error!r}")
 
 class Commands:
     def __init__(self, server_manager: ServerManager):
@@ -74,17 +96,22 @@ class Commands:
             kherimoya> list # Prints out servers
             ```
         """
-        servers = self.server_manager.list_server_objects()
-
-        for server in servers:
+        for server in self.server_manager.iter_servers():
             print(f"{server.name}{DELIMITER}{server.server_id}")
 
     def create_server(self, args):
         """
-        Create a new server with the given name
+        Create a new server with the given name, or many servers at once
 
         You can not specify the server ID, it will be generated automatically.
 
+        With `--template`, the server is cloned from a template (see `save-template`) instead of being installed.
+
+        With `--resume`, a creation which failed or timed out earlier is continued from where it stopped.
+
+        To create many servers at once, use `--count` (names become name1, name2, ...) or `--names-file` (one name per line),
+        with `--max-parallel` limiting how many are created at the same time.
+
         Example:
 
             ```python
@@ -97,19 +124,42 @@ class Commands:
             $ python3 cli.py create --name "MyServer" # Creates a server named "MyServer", with a generated ID
 
             kherimoya> create "MyServer" # Creates a server named "MyServer", with a generated ID
+
+            $ python3 cli.py create --name "event" --count 20 --max-parallel 4 # Creates event1 to event20, 4 at a time
+            $ python3 cli.py create --names-file names.txt # Creates a server for every name in names.txt
+            $ python3 cli.py create --name "lobby1" --template lobby # Clones the "lobby" template, without booting it
             ```
         """
-        if args.name is None:
-            raise exceptions.InvalidParameterError("Server name must be provided!")
-        name = args.name
-        server = self.server_manager.create_server(name)
-        print(f"Created server: {server.name}{DELIMITER}{server.server_id}")
+        if args.names_file is not None:
+            with open(args.names_file, "r", encoding="utf-8") as f:
+                names = [line.strip() for line in f if line.strip()]
+        elif args.count is not None:
+            if args.name is None:
+                raise exceptions.InvalidParameterError("Server name must be provided!")
+            names = [f"{args.name}{i}" for i in range(1, args.count + 1)]
+        else:
+            if args.name is None:
+                raise exceptions.InvalidParameterError("Server name must be provided!")
+            server = self.server_manager.create_server(
+                args.name, template=args.template, resume=args.resume
+            )
+            print(f"Created server: {server.name}{DELIMITER}{server.server_id}")
+            return
+
+        results = self.server_manager.create_servers(
+            names, template=args.template, resume=args.resume, **_given(max_parallel=args.max_parallel)
+        )
+        for result in results:
+            if result.ok:
+                print(f"Created server: {result.result.name}{DELIMITER}{result.result.server_id} ({result.seconds:.1f}s)")
+            else:
+                print(f"Failed to create server {result.target}: {result.error!r}")
 
     def delete_server(self, args):
         """
         Delete a server by its ID
 
-        Find these IDs through the `list` command.
+        Find these IDs through the `list` command. A unique prefix of the ID also works.
 
         Example:
 
@@ -132,7 +182,16 @@ class Commands:
 
     def start_server(self, args):
         """
-        Start a server by its ID
+        Start a server by its ID (or a unique prefix of it), or many servers at once
+
+        With `--all`, every stopped server is started (spares of the warm pool excepted), and with `--filter` only the
+        servers whose name matches a shell-style pattern. `--max-booting` limits how many boot at the same time, and
+        `--deadline` limits how long it may take overall.
+
+        With `--method supervisor`, endstone runs as a process supervised by Kherimoya instead of in a tmux session.
+
+        With `--wait`, the command returns once the server accepts players (many servers are always waited for), and
+        `--ping` additionally confirms that with a ping on the server's port.
 
         Example:
 
@@ -144,17 +203,44 @@ class Commands:
 
             ```shell
             $ python3 cli.py start --server-id "1234-5678" # Starts the server with ID "1234-5678"
+            $ python3 cli.py start --all --max-booting 8 # Starts every stopped server, 8 booting at a time
+            $ python3 cli.py start --filter "event*" # Starts every stopped server whose name starts with "event"
+            $ python3 cli.py start --server-id "1234-5678" --method supervisor # Starts it without tmux
+            $ python3 cli.py start --server-id "1234-5678" --wait --ping # Returns once it answers pings
 
             kherimoya> start
             ```
         """
+        if args.all or args.filter is not None:
+            results = self.server_manager.start_servers(
+                _filter_servers(self.server_manager, args.filter),
+                deadline=args.deadline,
+                method=args.method,
+                ping=args.ping,
+                **_given(max_booting=args.max_booting),
+            )
+            _print_bulk_results("Started", "start", results)
+            return
+
         server = _get_server_by_id(self.server_manager, args.server_id)
-        server.actions.start_server()
+        boot_seconds = server.actions.start_server(
+            args.method, wait="ready" if args.wait or args.ping else None, ping=args.ping
+        )
+        if boot_seconds is not None:
+            print(f"Started server: {server.name}{DELIMITER}{server.server_id} (ready after {boot_seconds:.1f}s)")
+            return
         print(f"Started server: {server.name}{DELIMITER}{server.server_id})")
 
     def stop_server(self, args):
         """
-        Stop a server by its ID
+        Stop a server by its ID (or a unique prefix of it), or many servers at once
+
+        With `--all`, every running server is stopped, and with `--filter` only the running servers whose name matches a
+        shell-style pattern. `--max-parallel` limits how many are stopped at the same time, and `--deadline` limits how
+        long it may take overall.
+
+        Servers get `--grace` seconds (60 by default) to shut down after `stop`, then they are sent SIGTERM, and SIGKILL
+        if that doesn't help either. `--no-escalate` gives up instead of signalling them.
 
         Example:
 
@@ -166,17 +252,37 @@ class Commands:
 
             ```shell
             $ python3 cli.py stop --server-id "1234-5678" # Stops
+            $ python3 cli.py stop --all --max-parallel 32 # Stops every running server, 32 at a time
+            $ python3 cli.py stop --filter "event*" --deadline 120 # Stops the "event" servers, giving up after 2 minutes
+            $ python3 cli.py stop --all --method supervisor # Stops every server started with --method supervisor
+            $ python3 cli.py stop --all --grace 20 # Kills servers which don't shut down within 20 seconds
 
             kherimoya> stop "1234-5678" # Stops the server with ID "1234-5678"
             ```
         """
+        if args.all or args.filter is not None:
+            results = self.server_manager.stop_servers(
+                _filter_servers(self.server_manager, args.filter),
+                grace=args.grace,
+                escalate=not args.no_escalate,
+                deadline=args.deadline,
+                method=args.method,
+                **_given(max_parallel=args.max_parallel),
+            )
+            for result in results:
+                if result.ok:
+                    print(f"Stopped server {result.target}: {_describe_stop(result.result)}")
+                else:
+                    print(f"Failed to stop server {result.target}: {result.error!r}")
+            return
+
         server = _get_server_by_id(self.server_manager, args.server_id)
-        server.actions.stop_server()
-        print(f"Stopped server: {server.name}{DELIMITER}{server.server_id}")
+        stop = server.actions.stop_server(args.method, grace=args.grace, escalate=not args.no_escalate)
+        print(f"Stopped server: {server.name}{DELIMITER}{server.server_id} ({_describe_stop(stop)})")
 
     def get_server_info(self, args):
         """
-        Prints out the direct server object for the given server ID, which includes its status and path.
+        Prints out the direct server object for the given server ID (or a unique prefix of it), which includes its status and path.
 
         Example:
 
@@ -194,6 +300,209 @@ class Commands:
         """
         print(_get_server_by_id(self.server_manager, args.server_id))
 
+    def rebuild_registry(self, args):
+        """
+        Rebuilds the server registry from the servers/ directory
+
+        Only needed if servers were added, removed or renamed by hand (not through Kherimoya).
+
+        Example:
+
+            ```python
+            commands.rebuild_registry() # Rebuilds the registry
+            ```
+
+            In the terminal:
+
+            ```shell
+            $ python3 cli.py rebuild-registry # Rebuilds the registry
+
+            kherimoya> rebuild-registry # Rebuilds the registry
+            ```
+        """
+        self.server_manager.rebuild_registry()
+        print(f"Rebuilt registry: {len(self.server_manager.list_server_ids())} servers")
+
+    def migrate_layout(self, args):
+        """
+        Converts the servers/ directory to another layout, moving every server
+
+        Layouts:
+        - `flat` (default): every server directly in servers/
+        - `sharded`: servers spread over hashed subdirectories of servers/, for very large amounts of servers
+
+        Stop all servers before migrating!
+
+        Example:
+
+            ```python
+            commands.migrate_layout(layout="sharded") # Moves every server into the sharded layout
+            ```
+
+            In the terminal:
+
+            ```shell
+            $ python3 cli.py migrate-layout --layout sharded # Moves every server into the sharded layout
+
+            kherimoya> migrate-layout --layout sharded # Moves every server into the sharded layout
+            ```
+        """
+        if args.layout is None:
+            raise exceptions.InvalidParameterError("Layout must be provided!")
+        moved = self.server_manager.migrate_layout(args.layout)
+        print(f"Migrated to {args.layout} layout: moved {moved} servers")
+
+    def save_template(self, args):
+        """
+        Saves a stopped server as a template, which new servers can be cloned from
+
+        Use `--no-world` to leave the server's world out of the template.
+
+        Example:
+
+            ```python
+            commands.save_template(server_id="1234-5678", template="lobby") # Saves the server as the "lobby" template
+            ```
+
+            In the terminal:
+
+            ```shell
+            $ python3 cli.py save-template --server-id "1234-5678" --template lobby # Saves the server as the "lobby" template
+
+            kherimoya> save-template --server-id "1234-5678" --template lobby
+            ```
+        """
+        if args.template is None:
+            raise exceptions.InvalidParameterError("Template name must be provided!")
+        server = _get_server_by_id(self.server_manager, args.server_id)
+        path = self.server_manager.save_template(server, args.template, include_world=not args.no_world)
+        print(f"Saved template: {args.template} ({path})")
+
+    def list_templates(self, args):
+        """
+        Lists all templates
+
+        Example:
+            ```shell
+            $ python3 cli.py templates # Prints out templates
+
+            kherimoya> templates # Prints out templates
+            ```
+        """
+        for name in self.server_manager.templates.names():
+            print(name)
+
+    def claim_server(self, args):
+        """
+        Gets a new server instantly by renaming a spare server of the warm pool
+
+        Falls back to creating the server (optionally from `--template`) if there are no spares. Fill the pool with `fill-pool`.
+
+        Example:
+
+            ```python
+            commands.claim_server(name="MyServer") # Hands out a spare server, named "MyServer"
+            ```
+
+            In the terminal:
+
+            ```shell
+            $ python3 cli.py claim --name "MyServer" # Hands out a spare server, named "MyServer"
+
+            kherimoya> claim --name "MyServer"
+            ```
+        """
+        if args.name is None:
+            raise exceptions.InvalidParameterError("Server name must be provided!")
+        server = self.server_manager.claim_server(args.name, template=args.template)
+        print(f"Claimed server: {server.name}{DELIMITER}{server.server_id}")
+
+    def fill_pool(self, args):
+        """
+        Creates spare servers for the warm pool until there are `--count` of them
+
+        Spares are cloned from `--template` if given. Meant to be run periodically (e.g. from cron); only creates
+        spares while the machine isn't busy.
+
+        Example:
+            ```shell
+            $ python3 cli.py fill-pool --count 5 --template lobby # Keeps 5 spare servers around
+
+            kherimoya> fill-pool --count 5 --template lobby
+            ```
+        """
+        if args.count is None:
+            raise exceptions.InvalidParameterError("Pool size (--count) must be provided!")
+        pool = WarmPool(self.server_manager, args.count, template=args.template)
+        created = pool.refill()
+        print(f"Created {created} spare servers, {len(self.server_manager.list_spare_servers())} available")
+
+    def dedup(self, args):
+        """
+        Replaces identical server files (BDS binary, packs, ...) across all servers with hardlinks, and reports the space saved
+
+        Example:
+
+            ```python
+            commands.dedup() # Deduplicates every server
+            ```
+
+            In the terminal:
+
+            ```shell
+            $ python3 cli.py dedup # Deduplicates every server
+
+            kherimoya> dedup # Deduplicates every server
+            ```
+        """
+        report = self.server_manager.dedup_servers()
+        print(
+            f"Linked {report.files_linked} of {report.files_scanned} files "
+            f"({report.blobs_added} new blobs), saved {report.bytes_saved / 1e6:.1f} MB"
+        )
+
+    def add_artifacts(self, args):
+        """
+        Adds a pre-fetched BDS zip (and optionally the Endstone wheel) to the local artifact mirror
+
+        New servers are then installed from the mirror instead of downloading BDS. The Endstone version defaults to the
+        installed one.
+
+        Example:
+            ```shell
+            $ python3 cli.py add-artifacts --bds-zip bedrock-server-1.21.50.zip --wheel endstone-0.6.2-cp312-cp312-manylinux_2_31_x86_64.whl
+
+            kherimoya> add-artifacts --bds-zip bedrock-server-1.21.50.zip
+            ```
+        """
+        if args.bds_zip is None:
+            raise exceptions.InvalidParameterError("BDS zip (--bds-zip) must be provided!")
+        version = args.endstone_version or endstone_version()
+        if version is None:
+            raise exceptions.InvalidParameterError("Endstone version could not be told, pass --endstone-version!")
+        manifest = self.server_manager.artifacts.add(
+            version, Path(args.bds_zip), wheel=Path(args.wheel) if args.wheel else None
+        )
+        print(f"Added artifacts for Endstone {version}: {', '.join(manifest['files'])}")
+
+    def verify_artifacts(self, args):
+        """
+        Checks every artifact in the local mirror against its checksum, and every file in the BDS zips
+
+        Example:
+            ```shell
+            $ python3 cli.py verify-artifacts
+
+            kherimoya> verify-artifacts
+            ```
+        """
+        for version in self.server_manager.artifacts.versions():
+            try:
+                self.server_manager.artifacts.verify(version, deep=True)
+                print(f"{version}: OK")
+            except exceptions.ArtifactError as e:
+                print(f"{version}: {e}")
+
     def help(self, args, command_map):
         """Prints out help information for commands"""
         if args.name in command_map:
@@ -214,12 +523,45 @@ command_map = {
     "start": commands.start_server,
     "stop": commands.stop_server,
     "info": commands.get_server_info,
+    "rebuild-registry": commands.rebuild_registry,
+    "migrate-layout": commands.migrate_layout,
+    "save-template": commands.save_template,
+    "templates": commands.list_templates,
+    "claim": commands.claim_server,
+    "fill-pool": commands.fill_pool,
+    "dedup": commands.dedup,
+    "add-artifacts": commands.add_artifacts,
+    "verify-artifacts": commands.verify_artifacts,
     "help": lambda args: commands.help(args, command_map),
 }
 
 if len(sys.argv) == 1: CONSOLE_MODE = True
 else: CONSOLE_MODE = False
 
+def add_arguments(parser):
+    parser.add_argument("command", type=str, help="Command to execute")
+    parser.add_argument("--name", type=str, help="Name of the server")
+    parser.add_argument("--server-id", type=str, help="ID of the server")
+    parser.add_argument("--layout", type=str, choices=["flat", "sharded"], help="Layout of servers/")
+    parser.add_argument("--count", type=int, help="Number of servers to create")
+    parser.add_argument("--names-file", type=str, help="File with one server name per line")
+    parser.add_argument("--max-parallel", type=int, help="Maximum number of servers to act on at once (default: 4 for create, 16 for stop)")
+    parser.add_argument("--template", type=str, help="Name of a template")
+    parser.add_argument("--no-world", action="store_true", help="Leave the world out of a saved template")
+    parser.add_argument("--resume", action="store_true", help="Continue unfinished server creations")
+    parser.add_argument("--bds-zip", type=str, help="Path to a BDS release zip")
+    parser.add_argument("--wheel", type=str, help="Path to an Endstone wheel")
+    parser.add_argument("--endstone-version", type=str, help="Endstone version the artifacts are for")
+    parser.add_argument("--all", action="store_true", help="Act on every server")
+    parser.add_argument("--filter", type=str, help="Only act on servers whose name matches this pattern (e.g. 'event*')")
+    parser.add_argument("--max-booting", type=int, help="Maximum number of servers booting at once (default: 4)")
+    parser.add_argument("--deadline", type=float, help="Overall time limit in seconds for acting on many servers")
+    parser.add_argument("--wait", action="store_true", help="Wait until a started server accepts players")
+    parser.add_argument("--ping", action="store_true", help="Confirm a started server is ready with a ping")
+    parser.add_argument("--grace", type=float, default=60, help="Seconds a server gets to stop before it is signalled")
+    parser.add_argument("--no-escalate", action="store_true", help="Don't signal servers which don't stop in time")
+    parser.add_argument("--method", type=str, choices=["tmux", "supervisor"], default="tmux", help="How servers are started and stopped")
+
 def run_command(args):
     try:
         if args.command in command_map:
@@ -241,9 +583,7 @@ if __name__ == "__main__":
                 try:
                     args = user_input.split()
                     parser = argparse.ArgumentParser(description="Kherimoya CLI", exit_on_error=False)
-                    parser.add_argument("command", type=str, help="Command to execute")
-                    parser.add_argument("--name", type=str, help="Name of the server")
-                    parser.add_argument("--server-id", type=str, help="ID of the server")
+                    add_arguments(parser)
                     parser.add_argument("--log-level", type=int, help="Log level for ServerManager", default=logging.INFO)
                     parsed_args = parser.parse_args(args)
                 except Exception as e:
@@ -256,8 +596,6 @@ if __name__ == "__main__":
             print("\nExiting Kherimoya CLI. Goodbye!")
     else: 
         parser = argparse.ArgumentParser(description="Kherimoya CLI")
-        parser.add_argument("command", type=str, help="Command to execute")
-        parser.add_argument("--name", type=str, help="Name of the server")
-        parser.add_argument("--server-id", type=str, help="ID of the server")
+        add_arguments(parser)
         args = parser.parse_args()
         run_command(args)
@@ -1,5 +1,12 @@
 from .servers import ServerManager, KherimoyaServer
+from .federation import FederatedServerManager
 from . import exceptions
 from . import constants
 
-__all__ = ["ServerManager", "KherimoyaServer", "exceptions", "constants"]
\ No newline at end of file
+__all__ = [
+    "ServerManager",
+    "KherimoyaServer",
+    "FederatedServerManager",
+    "exceptions",
+    "constants",
+]
\ No newline at end of file
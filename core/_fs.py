@@ -0,0 +1,165 @@
+"""Filesystem helpers (cloning server trees, block device load). Internal."""
+
+import errno
+import fcntl
+import os
+from pathlib import Path
+import shutil
+import stat
+from typing import Callable
+
+# errors which mean "can't hardlink here", rather than something actually being wrong
+_NO_LINK = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES}
+# the same for reflinks, which only some filesystems (btrfs, xfs, ...) support
+_NO_REFLINK = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY, errno.EPERM}
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), from linux/fs.h
+
+
+def reflink_or_copy(src: Path, dst: Path) -> bool:
+    """
+    Copies src to dst as a copy-on-write clone (FICLONE), which is instant and shares disk space until either file is
+    changed. Falls back to a regular copy where the filesystem doesn't support that.
+
+    Returns:
+        bool: True if dst was reflinked, False if it was copied.
+    """
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError as e:
+        if e.errno not in _NO_REFLINK:
+            raise
+    shutil.copy2(src, dst)
+    return False
+
+
+def make_read_only(path: Path) -> None:
+    """
+    Removes every write permission bit of a file (keeping the others, e.g. execute), so a server opening a shared
+    inode for writing fails instead of changing every other link to it.
+    """
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    if mode & 0o222:
+        os.chmod(path, mode & ~0o222)
+
+
+def link_or_copy(src: Path, dst: Path) -> bool:
+    """
+    Hardlinks src to dst, falling back to a copy if that isn't possible (e.g. different filesystems). A hardlinked file
+    is made read-only (see make_read_only), as its inode is now shared.
+
+    Returns:
+        bool: True if dst was hardlinked, False if it was copied.
+    """
+    try:
+        os.link(src, dst)
+        make_read_only(dst)
+        return True
+    except OSError as e:
+        if e.errno not in _NO_LINK:
+            raise
+    shutil.copy2(src, dst)
+    return False
+
+
+def break_links(root: Path) -> int:
+    """
+    Gives every hardlinked file under root its own writable inode: a reflink (or copy) of it replaces the link
+    atomically, so the file is never missing and no other link to the old inode changes.
+
+    Returns:
+        int: Number of files which were unlinked from shared inodes.
+    """
+    count = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            st = path.lstat()
+            if not stat.S_ISREG(st.st_mode) or st.st_nlink < 2:
+                continue
+            tmp = path.with_name(f".{filename}.unlink-{os.getpid()}")
+            try:
+                reflink_or_copy(path, tmp)
+                os.chmod(tmp, stat.S_IMODE(st.st_mode) | stat.S_IWUSR)
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            count += 1
+    return count
+
+
+def clone_tree(
+    src: Path,
+    dst: Path,
+    should_link: Callable[[str], bool],
+    skip: Callable[[str], bool] = lambda rel: False,
+) -> tuple[int, int]:
+    """
+    Recreates the tree at src in dst. Files for which should_link(relative path) is true are hardlinked (see
+    link_or_copy), every other file is copied, as a reflink where possible (see reflink_or_copy). Symlinks are recreated
+    as symlinks. dst may already exist.
+
+    Args:
+        src (Path): The tree to clone.
+        dst (Path): Where to clone it to.
+        should_link (Callable[[str], bool]): Whether to hardlink a file, given its path relative to src (with "/").
+        skip (Callable[[str], bool]): Whether to leave out a file or directory entirely.
+
+    Returns:
+        tuple[int, int]: Bytes which were hardlinked, and bytes which were copied.
+    """
+    linked = copied = 0
+    dst.mkdir(parents=True, exist_ok=True)
+
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel_dir = os.path.relpath(dirpath, src)
+        rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/") + "/"
+        target_dir = dst / rel_dir if rel_dir else dst
+
+        for dirname in list(dirnames):
+            rel = rel_dir + dirname
+            source = Path(dirpath) / dirname
+            if skip(rel):
+                dirnames.remove(dirname)
+            elif source.is_symlink():
+                dirnames.remove(dirname)  # recreated as a link, not walked into
+                os.symlink(os.readlink(source), target_dir / dirname)
+            else:
+                (target_dir / dirname).mkdir(exist_ok=True)
+
+        for filename in filenames:
+            rel = rel_dir + filename
+            if skip(rel):
+                continue
+            source = Path(dirpath) / filename
+            target = target_dir / filename
+            if source.is_symlink():
+                os.symlink(os.readlink(source), target)
+                continue
+            size = source.stat().st_size
+            if not should_link(rel):
+                reflink_or_copy(source, target)
+                copied += size
+            elif link_or_copy(source, target):
+                linked += size
+            else:
+                copied += size
+
+    return linked, copied
+
+
+def io_in_flight(path: Path) -> int | None:
+    """
+    Number of I/O requests in flight on the block device holding `path`, or None if that can't be told
+    (not Linux, or not backed by a plain block device).
+    """
+    st_dev = os.stat(path).st_dev
+    stat_path = Path(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}/stat")
+    try:
+        fields = stat_path.read_text().split()
+        return int(fields[8])
+    except (OSError, IndexError, ValueError):
+        return None
@@ -10,5 +10,12 @@ base_path="${2:?base path required}"
 unset HISTFILE
 HISTCONTROL=ignoreboth
 
+rm -f "${base_path}/state/exit_status"
+
+# run however endstone exits (set -e would skip plain commands after a failure): the exit status is recorded for
+# stop_server, and Kherimoya waits for __FINISHED__
+trap 'status=$?; echo "${status}" > "${base_path}/state/exit_status"; echo __FINISHED__' EXIT
+# a SIGTERM from stop_server's escalation would otherwise end bash without running the EXIT trap
+trap 'exit 143' TERM
+
 "${python_exec}" -m endstone -y -s "${base_path}/server"
-echo __FINISHED__
\ No newline at end of file
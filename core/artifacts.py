@@ -0,0 +1,284 @@
+"""Local mirror of pre-fetched BDS zips and Endstone wheels, so servers can be created without network access."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import zipfile
+
+from .blobs import file_digest
+from .cache import VERSION_FILE, endstone_version, minecraft_version
+from .exceptions import ArtifactError
+
+MANIFEST_FILE = "manifest.json"
+BDS_ZIP = "bedrock-server.zip"
+# never overwritten when they exist, like Endstone does when it installs BDS
+CONFIG_FILES = frozenset({"allowlist.json", "permissions.json", "server.properties"})
+# Endstone's changes to a freshly installed server.properties
+_PROPERTY_DEFAULTS = {
+    "server-name=Dedicated Server": "server-name=Endstone Server",
+    "client-side-chunk-generation-enabled=true": "client-side-chunk-generation-enabled=false",
+}
+
+
+def _partition(items: list, parts: int) -> list[list]:
+    """
+    Splits items into `parts` lists of about the same total size (items are ZipInfos).
+    """
+    buckets: list[list] = [[] for _ in range(parts)]
+    sizes = [0] * parts
+    for item in sorted(items, key=lambda i: i.file_size, reverse=True):
+        smallest = sizes.index(min(sizes))
+        buckets[smallest].append(item)
+        sizes[smallest] += item.file_size
+    return [b for b in buckets if b]
+
+
+class ArtifactMirror:
+    """
+    Pre-fetched artifacts, one directory per Endstone version:
+
+    ```
+    artifacts/
+        0.6.2/
+            manifest.json           # versions and the sha256 of every file
+            bedrock-server.zip      # the BDS release this Endstone version runs
+            endstone-0.6.2-....whl  # optional
+    ```
+
+    Every file is checked against its sha256 before it is used, and the BDS zip is extracted on several threads at
+    once, with the CRC of every member checked as it's extracted.
+    """
+
+    def __init__(self, path: Path, max_workers: int | None = None, logger: logging.Logger | None = None) -> None:
+        """
+        Args:
+            path (Path): The artifacts/ directory.
+            max_workers (int | None = None): Threads used for verifying and extracting. Defaults to the CPU count
+                (at most 8).
+        """
+        self._path = path
+        self._max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def path_for(self, version: str) -> Path:
+        return self._path / version
+
+    def has(self, version: str) -> bool:
+        return (self.path_for(version) / MANIFEST_FILE).is_file()
+
+    def versions(self) -> list[str]:
+        if not self._path.is_dir():
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(self._path) if entry.is_dir() and self.has(entry.name)
+        )
+
+    def manifest(self, version: str) -> dict:
+        try:
+            with open(self.path_for(version) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ArtifactError(f"No artifacts for Endstone {version}") from None
+
+    def add(
+        self,
+        version: str,
+        bds_zip: Path,
+        wheel: Path | None = None,
+        bds_version: str | None = None,
+    ) -> dict:
+        """
+        Adds the artifacts of an Endstone version to the mirror, replacing existing ones.
+
+        Args:
+            version (str): The Endstone version.
+            bds_zip (Path): The BDS release zip (bedrock-server-<version>.zip).
+            wheel (Path | None = None): The Endstone wheel, for installing Endstone offline.
+            bds_version (str | None = None): The BDS version of the zip, which extract_bds records in version.txt.
+                Defaults to the BDS version of the installed Endstone, if that is the version being added.
+
+        Returns:
+            dict: The new manifest.
+        """
+        if not zipfile.is_zipfile(bds_zip):
+            raise ArtifactError(f"Not a zip file: {bds_zip}")
+        if bds_version is None and version == endstone_version():
+            bds_version = minecraft_version()
+
+        directory = self.path_for(version)
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {BDS_ZIP: bds_zip}
+        if wheel is not None:
+            files[wheel.name] = wheel
+
+        for name, source in files.items():
+            shutil.copy2(source, directory / name)
+        with ThreadPoolExecutor(max_workers=len(files)) as pool:
+            digests = dict(zip(files, pool.map(lambda n: file_digest(directory / n), files)))
+
+        manifest = {
+            "endstone_version": version,
+            "bds_version": bds_version,
+            "files": digests,
+            "added": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        tmp = directory / f".{MANIFEST_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp, directory / MANIFEST_FILE)
+
+        self.logger.info(f"Added artifacts for Endstone {version}: {', '.join(files)}")
+        return manifest
+
+    def verify(self, version: str, deep: bool = False) -> None:
+        """
+        Checks every file of a version against its sha256 (in parallel), and with `deep` also the CRC of every
+        member of the BDS zip.
+
+        Raises:
+            ArtifactError: If a file is missing or doesn't match.
+        """
+        manifest = self.manifest(version)
+        directory = self.path_for(version)
+
+        def check(item: tuple[str, str]) -> str | None:
+            name, expected = item
+            try:
+                actual = file_digest(directory / name)
+            except FileNotFoundError:
+                return f"{name} is missing"
+            return None if actual == expected else f"{name} does not match its checksum"
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            problems = [p for p in pool.map(check, manifest["files"].items()) if p]
+        if problems:
+            raise ArtifactError(f"Artifacts for Endstone {version} are damaged: {'; '.join(problems)}")
+
+        if deep:
+            self._run_on_members(directory / BDS_ZIP, self._check_members)
+
+    def _run_on_members(self, zip_path: Path, fn, skip: frozenset[str] = frozenset()) -> None:
+        """
+        Runs fn(zip_path, members) on several threads, every one with its own share of the zip's members (and its
+        own file handle, so they don't contend on a shared one). Members named in skip are left out.
+        """
+        with zipfile.ZipFile(zip_path) as archive:
+            members = [member for member in archive.infolist() if member.filename not in skip]
+        buckets = _partition(members, self._max_workers)
+        with ThreadPoolExecutor(max_workers=max(1, len(buckets)), thread_name_prefix="kherimoya-unzip") as pool:
+            for future in [pool.submit(fn, zip_path, bucket) for bucket in buckets]:
+                future.result()
+
+    @staticmethod
+    def _check_members(zip_path: Path, members: list[zipfile.ZipInfo]) -> None:
+        with zipfile.ZipFile(zip_path) as archive:
+            for member in members:
+                with archive.open(member) as f:
+                    try:
+                        while f.read(1024 * 1024):
+                            pass
+                    except zipfile.BadZipFile as e:
+                        raise ArtifactError(f"{zip_path.name}: {member.filename}: {e}") from e
+
+    @staticmethod
+    def _extract_members(dest: Path, zip_path: Path, members: list[zipfile.ZipInfo]) -> None:
+        with zipfile.ZipFile(zip_path) as archive:
+            for member in members:
+                try:
+                    path = Path(archive.extract(member, dest))  # checks the CRC while extracting
+                except zipfile.BadZipFile as e:
+                    raise ArtifactError(f"{zip_path.name}: {member.filename}: {e}") from e
+                mode = member.external_attr >> 16
+                if mode and not member.is_dir():
+                    os.chmod(path, mode & 0o777)  # zipfile drops permissions, bedrock_server must stay executable
+
+    def extract_bds(self, version: str, dest: Path, verify: bool = True, bds_version: str | None = None) -> None:
+        """
+        Extracts the BDS zip of a version into dest (a server's server/ directory), on several threads at once.
+
+        Finishes the install the way Endstone does, so Endstone finds it up to date instead of downloading BDS again:
+        existing config files are kept, a new server.properties gets Endstone's defaults, and version.txt records the
+        BDS version.
+
+        Args:
+            version (str): The Endstone version.
+            dest (Path): Where to extract to.
+            verify (bool = True): Whether or not to check the zip's sha256 first.
+            bds_version (str | None = None): The BDS version the Endstone which runs the server expects. If None, the
+                manifest's bds_version.
+
+        Raises:
+            ArtifactError: If the zip is missing or damaged, or its BDS version is unknown or isn't bds_version.
+        """
+        recorded = self.manifest(version).get("bds_version")
+        if bds_version is not None and recorded is not None and bds_version != recorded:
+            raise ArtifactError(
+                f"Artifacts for Endstone {version} hold BDS {recorded}, but BDS {bds_version} is needed"
+            )
+        bds_version = bds_version or recorded
+        if bds_version is None:
+            raise ArtifactError(f"BDS version of the artifacts for Endstone {version} is unknown")
+
+        if verify:
+            expected = self.manifest(version)["files"].get(BDS_ZIP)
+            zip_path = self.path_for(version) / BDS_ZIP
+            if expected is None or not zip_path.is_file() or file_digest(zip_path) != expected:
+                raise ArtifactError(f"BDS zip for Endstone {version} is missing or does not match its checksum")
+
+        # directories first, so extracting threads don't race on creating the same ones
+        dest.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(self.path_for(version) / BDS_ZIP) as archive:
+            for name in archive.namelist():
+                parent = (dest / name).parent if not name.endswith("/") else dest / name
+                parent.mkdir(parents=True, exist_ok=True)
+
+        kept = frozenset(name for name in CONFIG_FILES if (dest / name).exists())
+        self._run_on_members(
+            self.path_for(version) / BDS_ZIP,
+            lambda zip_path, members: self._extract_members(dest, zip_path, members),
+            skip=kept,
+        )
+
+        properties = dest / "server.properties"
+        if not kept and properties.is_file():
+            with open(properties, "r", encoding="utf-8") as f:
+                lines = [
+                    _PROPERTY_DEFAULTS[line.strip()] + "\n" if line.strip() in _PROPERTY_DEFAULTS else line
+                    for line in f
+                ]
+            with open(properties, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+        (dest / VERSION_FILE).write_text(bds_version, encoding="utf-8")
+        self.logger.debug(f"Extracted BDS {bds_version} for Endstone {version} to {dest}")
+
+    def install_endstone(self, version: str) -> None:
+        """
+        Installs the Endstone wheel of a version into the current Python environment, without network access.
+        """
+        manifest = self.manifest(version)
+        if not any(name.endswith(".whl") for name in manifest["files"]):
+            raise ArtifactError(f"No Endstone wheel in the artifacts for Endstone {version}")
+        self.verify(version)
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--no-index",
+                "--find-links",
+                str(self.path_for(version)),
+                f"endstone=={version}",
+            ],
+            check=True,
+        )
@@ -0,0 +1,214 @@
+"""Content-addressed blob store, and deduplicating server files into it with hardlinks."""
+
+from dataclasses import dataclass
+import errno
+import hashlib
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Callable, Iterable
+
+from . import _fs
+from .cache import is_immutable
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class DedupReport:
+    """
+    What a dedup pass did.
+
+    Attributes:
+        files_scanned (int): Files which were looked at.
+        files_linked (int): Files which were replaced by a hardlink to a blob.
+        blobs_added (int): New blobs, i.e. contents which weren't in the store yet.
+        bytes_saved (int): Disk space freed by the replaced files.
+    """
+
+    files_scanned: int = 0
+    files_linked: int = 0
+    blobs_added: int = 0
+    bytes_saved: int = 0
+
+    def __iadd__(self, other: "DedupReport") -> "DedupReport":
+        self.files_scanned += other.files_scanned
+        self.files_linked += other.files_linked
+        self.blobs_added += other.blobs_added
+        self.bytes_saved += other.bytes_saved
+        return self
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore:
+    """
+    Files stored by the SHA-256 of their contents, under <project>/blobs/<first 2 hex digits>/<digest>.
+
+    Identical files in different servers are replaced with hardlinks to the same blob, so they take disk (and page
+    cache) space once. Only immutable files (see cache.is_immutable) are deduplicated, as a server writing to a shared
+    inode would change every other server's copy; blobs are read-only for the same reason. A blob's link count tells
+    how many servers still use it; gc removes the ones no server uses.
+
+    Files which already are a link to a blob are recognised by their inode, so repeated passes don't hash them again.
+    """
+
+    def __init__(self, path: Path, min_size: int = 4096, logger: logging.Logger | None = None) -> None:
+        """
+        Args:
+            path (Path): The blobs/ directory.
+            min_size (int = 4096): Files smaller than this aren't worth a blob.
+        """
+        self._path = path
+        self._min_size = min_size
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._inodes: dict[tuple[int, int], str] | None = None  # (st_dev, st_ino) of every blob -> digest
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def path_for(self, digest: str) -> Path:
+        return self._path / digest[:2] / digest
+
+    def _load_inodes(self) -> dict[tuple[int, int], str]:
+        if self._inodes is None:
+            inodes = {}
+            if self._path.is_dir():
+                for shard in os.scandir(self._path):
+                    if not shard.is_dir():
+                        continue
+                    for blob in os.scandir(shard.path):
+                        st = blob.stat(follow_symlinks=False)
+                        inodes[(st.st_dev, st.st_ino)] = blob.name
+            self._inodes = inodes
+        return self._inodes
+
+    def _dedup_file(self, path: Path, st: os.stat_result, report: DedupReport) -> None:
+        digest = file_digest(path)
+        blob = self.path_for(digest)
+
+        with self._lock:
+            try:
+                blob_st = blob.stat()
+            except FileNotFoundError:
+                # first file with these contents, it becomes the blob
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, blob)
+                except FileExistsError:
+                    blob_st = blob.stat()  # another process added it just now
+                else:
+                    _fs.make_read_only(blob)
+                    self._load_inodes()[(st.st_dev, st.st_ino)] = digest
+                    report.blobs_added += 1
+                    return
+            except OSError:
+                return
+
+            if (blob_st.st_dev, blob_st.st_ino) == (st.st_dev, st.st_ino):
+                return
+            self._load_inodes()[(blob_st.st_dev, blob_st.st_ino)] = digest
+            _fs.make_read_only(blob)  # blobs stored before blobs were made read-only
+
+        # swap the file for a link to the blob atomically, so the server never sees it missing
+        tmp = path.with_name(f".{path.name}.dedup-{os.getpid()}")
+        try:
+            os.link(blob, tmp)
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+                return  # other filesystem, or too many links already
+            raise
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        report.files_linked += 1
+        if st.st_nlink == 1:  # otherwise the old contents are still used elsewhere
+            report.bytes_saved += st.st_size
+
+    def dedup_tree(
+        self,
+        root: Path,
+        should_dedup: Callable[[str], bool] = is_immutable,
+    ) -> DedupReport:
+        """
+        Deduplicates the files of one directory tree (e.g. a server's server/) against the store.
+
+        Args:
+            root (Path): The tree to deduplicate.
+            should_dedup (Callable[[str], bool] = cache.is_immutable): Whether to deduplicate a file, given its path
+                relative to root (with "/").
+
+        Returns:
+            DedupReport: What was done.
+        """
+        report = DedupReport()
+        inodes = self._load_inodes()
+
+        for dirpath, _, filenames in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, root)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/") + "/"
+            for filename in filenames:
+                if not should_dedup(rel_dir + filename):
+                    continue
+                path = Path(dirpath) / filename
+                try:
+                    st = path.lstat()
+                except FileNotFoundError:
+                    continue
+                if not path.is_file() or path.is_symlink() or st.st_size < self._min_size:
+                    continue
+
+                report.files_scanned += 1
+                if (st.st_dev, st.st_ino) in inodes:
+                    continue  # already a link to a blob
+                try:
+                    self._dedup_file(path, st, report)
+                except OSError as e:
+                    self.logger.warning(f"Failed to deduplicate {path}: {e}")
+
+        return report
+
+    def dedup(self, roots: Iterable[Path]) -> DedupReport:
+        """
+        Deduplicates several trees, see dedup_tree.
+        """
+        report = DedupReport()
+        for root in roots:
+            report += self.dedup_tree(root)
+        return report
+
+    def gc(self) -> tuple[int, int]:
+        """
+        Removes blobs which no server links to anymore.
+
+        Returns:
+            tuple[int, int]: Number of blobs removed, and the bytes freed.
+        """
+        removed = freed = 0
+        if not self._path.is_dir():
+            return removed, freed
+        with self._lock:
+            for shard in os.scandir(self._path):
+                if not shard.is_dir():
+                    continue
+                for blob in os.scandir(shard.path):
+                    st = blob.stat(follow_symlinks=False)
+                    if st.st_nlink == 1:
+                        os.unlink(blob.path)
+                        removed += 1
+                        freed += st.st_size
+                        if self._inodes is not None:
+                            self._inodes.pop((st.st_dev, st.st_ino), None)
+        return removed, freed
@@ -0,0 +1,105 @@
+"""Running server operations on many servers at once, with bounded parallelism."""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class OperationResult(Generic[T]):
+    """
+    The outcome of one operation of a bulk call (e.g. one server of ServerManager.create_servers).
+
+    Attributes:
+        target (str): What the operation was for, e.g. the server name or ID.
+        result (T | None): What the operation returned, if it succeeded.
+        error (BaseException | None): What it raised, if it failed.
+        seconds (float): How long it took.
+    """
+
+    target: str
+    result: T | None = None
+    error: BaseException | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_bounded(
+    targets: Iterable[str],
+    fn: Callable[[str], T],
+    max_parallel: int = 4,
+    deadline: float | None = None,
+    thread_name_prefix: str = "kherimoya-bulk",
+) -> list[OperationResult[T]]:
+    """
+    Runs fn for every target on a pool of at most `max_parallel` threads.
+
+    Args:
+        targets (Iterable[str]): What to run fn for.
+        fn (Callable[[str], T]): The operation; whatever it raises is recorded in that target's result.
+        max_parallel (int = 4): Maximum number of operations running at once.
+        deadline (float | None = None): Overall time limit in seconds. Targets which haven't started by then fail with
+            TimeoutError, and the call returns without waiting for ones still running (their results also get a
+            TimeoutError). If None, wait for everything.
+
+    Returns:
+        list[OperationResult[T]]: One result per target, in the same order as targets.
+    """
+    if max_parallel < 1:
+        raise ValueError("max_parallel must be at least 1")
+
+    targets = list(targets)
+    results = [OperationResult(target) for target in targets]
+    end = time.monotonic() + deadline if deadline is not None else None
+    cancelled = threading.Event()
+
+    def run(i: int) -> None:
+        result = results[i]
+        if cancelled.is_set() or (end is not None and time.monotonic() >= end):
+            result.error = TimeoutError("Deadline passed before the operation started")
+            return
+        start = time.monotonic()
+        try:
+            result.result = fn(result.target)
+        except BaseException as e:
+            result.error = e
+        finally:
+            result.seconds = time.monotonic() - start
+
+    pool = ThreadPoolExecutor(
+        max_workers=min(max_parallel, max(len(targets), 1)),
+        thread_name_prefix=thread_name_prefix,
+    )
+    started = time.monotonic()
+    try:
+        futures = {pool.submit(run, i): i for i in range(len(targets))}
+        pending: set[Any] = set(futures)
+        while pending:
+            timeout = None if end is None else max(0.0, end - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done and end is not None and time.monotonic() >= end:
+                cancelled.set()
+                for future in pending:
+                    i = futures[future]
+                    # a fresh result, so operations which are still running can't change what is returned
+                    results[i] = OperationResult(
+                        results[i].target,
+                        error=TimeoutError(
+                            "Deadline passed before the operation started"
+                            if future.cancel()
+                            else "Operation did not finish before the deadline"
+                        ),
+                        seconds=time.monotonic() - started,
+                    )
+                break
+    finally:
+        pool.shutdown(wait=end is None, cancel_futures=True)
+
+    return results
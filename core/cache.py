@@ -0,0 +1,157 @@
+"""Shared, versioned cache of Bedrock Dedicated Server installs, which new servers are populated from."""
+
+from importlib import metadata, util
+import logging
+import os
+from pathlib import Path
+import re
+import shutil
+
+from . import _fs
+
+# top level entries of an install which are never cached, as every server makes its own
+EXCLUDED = frozenset({"worlds", "plugins", "logs", "crash_reports"})
+# top level directories whose files are never modified by a server, so they can be shared through hardlinks
+IMMUTABLE_DIRS = frozenset({"behavior_packs", "resource_packs", "definitions"})
+COMPLETE_MARKER = ".complete"
+VERSION_FILE = "version.txt"  # in server/, the BDS version installed there; Endstone installs BDS again without it
+
+
+def endstone_version() -> str | None:
+    """
+    The installed Endstone version, which also determines the BDS version it installs. None if it can't be told.
+    """
+    try:
+        return metadata.version("endstone")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def minecraft_version() -> str | None:
+    """
+    The BDS version the installed Endstone runs (endstone.__minecraft_version__). It's read from Endstone's source, as
+    importing endstone loads its native module. None if it can't be told.
+    """
+    try:
+        spec = util.find_spec("endstone")
+    except (ImportError, ValueError):
+        return None
+    if spec is None or spec.origin is None:
+        return None
+    try:
+        source = Path(spec.origin).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    match = re.search(r"^__minecraft_version__\s*=\s*[\"']([^\"']+)[\"']", source, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def is_immutable(rel: str) -> bool:
+    """
+    Whether or not a file of an install (path relative to server/) is never modified by the server.
+    """
+    top, _, rest = rel.partition("/")
+    if rest:
+        return top in IMMUTABLE_DIRS
+    # top level files: the server binary and shared libraries, everything else (configs, ...) gets its own copy
+    return top == "bedrock_server" or top.endswith(".so") or ".so." in top
+
+
+def _is_excluded(rel: str) -> bool:
+    return rel.partition("/")[0] in EXCLUDED
+
+
+class InstallCache:
+    """
+    Keeps one complete install of server/ per Endstone version, under <project>/cache/bds/<version>.
+
+    The first server created for a version is installed by Endstone as usual and then stored; every later server is
+    populated from the cache before Endstone runs, which then finds BDS already installed and skips the download.
+    Immutable files (the binary, libraries, packs and definitions) are hardlinked so they take no extra disk space,
+    and made read-only, as writing to one would change it for every server; config files are copied so servers can
+    change them independently.
+    """
+
+    def __init__(self, path: Path, logger: logging.Logger | None = None) -> None:
+        self._path = path
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def path_for(self, version: str) -> Path:
+        return self._path / version
+
+    def has(self, version: str) -> bool:
+        return (self.path_for(version) / COMPLETE_MARKER).is_file()
+
+    def versions(self) -> list[str]:
+        """
+        Lists every version which is fully cached.
+        """
+        if not self._path.is_dir():
+            return []
+        return sorted(
+            entry.name
+            for entry in os.scandir(self._path)
+            if entry.is_dir() and not entry.name.startswith(".") and self.has(entry.name)
+        )
+
+    def populate(self, version: str, server_path: Path) -> bool:
+        """
+        Fills a server's server/ directory from the cached install of the given version.
+
+        Returns:
+            bool: False if the version isn't cached (server_path is left untouched).
+        """
+        if not self.has(version):
+            return False
+
+        linked, copied = _fs.clone_tree(
+            self.path_for(version),
+            server_path,
+            should_link=is_immutable,
+            skip=lambda rel: rel == COMPLETE_MARKER,
+        )
+        self.logger.info(
+            f"Populated {server_path} from the {version} install cache "
+            f"({linked / 1e6:.1f} MB linked, {copied / 1e6:.1f} MB copied)"
+        )
+        return True
+
+    def store(self, version: str, server_path: Path) -> bool:
+        """
+        Stores a freshly installed server/ directory as the cached install of the given version. Worlds, plugins and
+        logs are left out.
+
+        The install is assembled in a temporary directory and renamed into place, so concurrent creators never see a
+        partial cache entry.
+
+        Returns:
+            bool: False if the version was already cached.
+        """
+        if self.has(version):
+            return False
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        tmp = self._path / f".{version}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            _fs.clone_tree(server_path, tmp, should_link=is_immutable, skip=_is_excluded)
+            (tmp / COMPLETE_MARKER).touch()
+            os.rename(tmp, self.path_for(version))
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if self.has(version):
+                return False  # someone else stored it first
+            raise
+
+        self.logger.info(f"Stored the {version} install in the install cache")
+        return True
+
+    def remove(self, version: str) -> None:
+        """
+        Removes a cached version. Servers populated from it keep working, as hardlinked files stay around.
+        """
+        shutil.rmtree(self.path_for(version), ignore_errors=True)
@@ -0,0 +1,123 @@
+"""Progress checkpoints of server creation, so an interrupted creation can be resumed instead of started over."""
+
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+
+CREATION_FILE = "creation.json"  # in a server's state/, only there while the server is being created
+
+# in order; "bds_ready" is only reached when BDS came from the install cache or artifact mirror
+STAGES = ("dirs_created", "bds_ready", "installed", "world_generated", "stopped")
+
+
+def checkpoint_path(base_path: Path) -> Path:
+    return base_path / "state" / CREATION_FILE
+
+
+def is_incomplete(base_path: Path) -> bool:
+    """
+    Whether or not the server at base_path was never finished being created.
+    """
+    return checkpoint_path(base_path).is_file()
+
+
+class CreationCheckpoint:
+    """
+    The stages of a creation which are done, in state/creation.json. Written atomically after every stage, and
+    removed once the server is fully created.
+    """
+
+    def __init__(self, base_path: Path) -> None:
+        self._path = checkpoint_path(base_path)
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {"completed": {}, "attempts": 0}
+
+    @property
+    def completed(self) -> list[str]:
+        """
+        The completed stages, in order.
+        """
+        return [stage for stage in STAGES if stage in self._data["completed"]]
+
+    @property
+    def last(self) -> str | None:
+        completed = self.completed
+        return completed[-1] if completed else None
+
+    @property
+    def attempts(self) -> int:
+        return self._data.get("attempts", 0)
+
+    def done(self, stage: str) -> bool:
+        return stage in self._data["completed"]
+
+    def get(self, key: str, default=None):
+        return self._data.get(key, default)
+
+    def owner_alive(self) -> bool:
+        """
+        Whether or not another live process is working on this creation right now.
+        """
+        pid = self._data.get("pid")
+        if not pid or pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _save(self) -> None:
+        tmp = self._path.with_name(f".{self._path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=4)
+        os.replace(tmp, self._path)
+
+    def begin_attempt(self, **values) -> None:
+        """
+        Marks this process as working on the creation.
+        """
+        self._data["attempts"] = self.attempts + 1
+        self._data["pid"] = os.getpid()
+        self._data.update(values)
+        self._save()
+
+    def update(self, **values) -> None:
+        """
+        Remembers values for a resume, without completing a stage.
+        """
+        self._data.update(values)
+        self._save()
+
+    def complete(self, stage: str, **values) -> None:
+        """
+        Records a stage as done, with any extra values to remember for a resume.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown creation stage: {stage}")
+        self._data["completed"][stage] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._data.update(values)
+        self._save()
+
+    def reset(self, *stages: str) -> None:
+        """
+        Forgets that the given stages were done, e.g. because their result was thrown away.
+        """
+        for stage in stages:
+            self._data["completed"].pop(stage, None)
+        self._save()
+
+    def finish(self) -> None:
+        """
+        Removes the checkpoint, the server is fully created.
+        """
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,155 @@
+"""Streamed server console output (state/console.log), and waiting on it without polling."""
+
+from pathlib import Path
+import time
+from typing import Callable
+
+from . import _inotify
+
+CONSOLE_LOG = "console.log"  # in a server's state/
+FINISHED_MARKER = "__FINISHED__"  # printed by _scripts/start_endstone.sh when endstone exits
+
+_TAIL_BYTES = 16 * 1024
+
+
+class ConsoleLog:
+    """
+    Incremental reader of a server's console log, which tmux (pipe-pane) or the process itself appends to.
+
+    Only new output is read on every call, so checking for a line costs one read of whatever was appended since.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._offset = 0
+        self._tail = ""  # the end of what was read so far, so markers split over two reads are still found
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def create(self) -> None:
+        """
+        Creates (or empties) the log, and starts reading from its beginning.
+        """
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.write_bytes(b"")
+        self._offset = 0
+        self._tail = ""
+
+    def skip_to_end(self) -> None:
+        """
+        Ignores everything already in the log, e.g. output of a previous run.
+        """
+        try:
+            self._offset = self._path.stat().st_size
+        except FileNotFoundError:
+            self._offset = 0
+        self._tail = ""
+
+    def read_new(self) -> str:
+        """
+        Returns the output appended since the last call.
+        """
+        try:
+            with open(self._path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return ""
+        self._offset += len(data)
+        text = data.decode("utf-8", errors="replace")
+        self._tail = (self._tail + text)[-_TAIL_BYTES:]
+        return text
+
+    def seen(self, marker: str) -> bool:
+        """
+        Reads new output, and tells whether marker appeared in the recent output.
+        """
+        self.read_new()
+        return marker in self._tail
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether or not the process writing to the log has exited.
+        """
+        return self.seen(FINISHED_MARKER)
+
+    def tail(self, lines: int = 20) -> str:
+        """
+        The last lines of output read so far.
+        """
+        self.read_new()
+        return "\n".join(self._tail.splitlines()[-lines:])
+
+
+def wait_until(
+    condition: Callable[[], bool],
+    watches: list[tuple[Path, int]],
+    timeout: float | None = None,
+    poll_interval: float = 5.0,
+    slow_condition: Callable[[], bool] | None = None,
+) -> bool:
+    """
+    Waits for condition() to become true, re-checking it whenever inotify reports one of the watched events, so the
+    caller wakes as soon as something changes instead of on the next poll.
+
+    Args:
+        condition (Callable[[], bool]): Cheap check, run on every wakeup.
+        watches (list[tuple[Path, int]]): Paths and inotify masks to wake up on. Paths which don't exist are skipped.
+        timeout (float | None = None): Maximum seconds to wait, or None to wait forever.
+        poll_interval (float = 5.0): Longest time between checks when nothing happens, as a fallback (and the polling
+            interval where inotify isn't available).
+        slow_condition (Callable[[], bool] | None = None): Expensive check (e.g. one which runs a subprocess), only run
+            every poll_interval. Waiting also ends once it's true.
+
+    Returns:
+        bool: True if a condition became true, False on timeout.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    try:
+        inotify: _inotify.Inotify | None = _inotify.Inotify()
+    except OSError:
+        inotify = None
+
+    try:
+        if inotify is not None:
+            for path, mask in watches:
+                try:
+                    inotify.add_watch(path, mask)
+                except OSError:
+                    pass  # doesn't exist (yet), the poll fallback covers it
+        else:
+            poll_interval = min(poll_interval, 0.5)
+
+        last_slow_check = time.monotonic()
+        while True:
+            # watches are set up first, so nothing which happens from here on is missed
+            if condition():
+                return True
+
+            now = time.monotonic()
+            if slow_condition is not None and now - last_slow_check >= poll_interval:
+                if slow_condition():
+                    return True
+                last_slow_check = now
+
+            if deadline is not None and now >= deadline:
+                return False
+
+            wait = poll_interval
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            if inotify is not None:
+                inotify.read(wait)
+            else:
+                time.sleep(wait)
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+
+def console_log_path(base_path: Path) -> Path:
+    return base_path / "state" / CONSOLE_LOG
@@ -1 +1,14 @@
-DELIMITER = "@"
\ No newline at end of file
+DELIMITER = "@"
+
+# project-level state, relative to the project root
+STATE_DIR = "state"
+REGISTRY_FILE = "registry.sqlite3"
+IDS_BITMAP_FILE = "ids.bitmap"
+RESERVATIONS_DIR = "reservations"
+CACHE_DIR = "cache"
+TEMPLATES_DIR = "templates"
+BLOBS_DIR = "blobs"
+ARTIFACTS_DIR = "artifacts"
+
+# relative to servers/
+LAYOUT_FILE = ".kherimoya-layout"
@@ -7,6 +7,9 @@ class ServerNotInPathError(Exception):
 class ServerDoesNotExistError(Exception):
     """Raised when a method which requires the server to exist is called when it does not"""
 
+class AmbiguousServerError(Exception):
+    """Raised when a partial server ID or name matches more than one server"""
+
 class ServerNotRunningError(Exception):
     """Raised when a method which requires the server to be running is called when it is not"""
 
@@ -26,4 +29,10 @@ class ServerRenameError(Exception):
     """Raised when a server could not be renamed"""
 
 class InvalidParameterError(Exception):
-    """Raised when an invalid parameter is provided to a method"""
\ No newline at end of file
+    """Raised when an invalid parameter is provided to a method"""
+
+class ArtifactError(Exception):
+    """Raised when a mirrored artifact is missing, or does not match its checksum"""
+
+class TmuxError(Exception):
+    """Raised when a tmux command fails, or the connection to tmux is lost"""
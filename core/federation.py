@@ -0,0 +1,235 @@
+"""Federated server management across several Kherimoya project roots (e.g. one per disk)."""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+from pathlib import Path
+import shutil
+from typing import Callable, Iterator, Literal, TypeVar
+
+from . import _fs, exceptions
+from .servers import ServerManager, KherimoyaServer
+
+T = TypeVar("T")
+
+
+class FederatedServerManager:
+    """
+    Aggregates several ServerManagers (one per project root) behind the same API as ServerManager.
+
+    Listing runs on every root in parallel, lookups ask every root's (in-memory) index, and new servers are placed on
+    the root with the most free space or the least I/O in flight.
+
+    Server IDs are generated per root, so two roots can (very rarely) hand out the same ID; get_server_by_id then
+    returns the server from the first root.
+    """
+
+    def __init__(
+        self,
+        roots: list[Path | ServerManager],
+        placement: Literal["free_space", "io_load"] = "free_space",
+        strict_names: bool = True,
+        log_level: int = logging.INFO,
+    ):
+        """
+        Args:
+            roots (list[Path | ServerManager]): Project roots (each with its own servers/), or ServerManagers for them.
+            placement (Literal["free_space", "io_load"] = "free_space"): How create_server picks a root.
+            strict_names (bool = True): Whether or not server names must be unique across all roots.
+        """
+        if not roots:
+            raise exceptions.InvalidParameterError("At least one root must be provided")
+        if placement not in ("free_space", "io_load"):
+            raise exceptions.InvalidParameterError(f"Invalid placement: {placement}")
+
+        self._managers = [
+            root
+            if isinstance(root, ServerManager)
+            else ServerManager(root, strict_names=strict_names, log_level=log_level)
+            for root in roots
+        ]
+        self._placement = placement
+        self._strict_names = strict_names
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(log_level)
+
+    @property
+    def managers(self) -> list[ServerManager]:
+        return list(self._managers)
+
+    @property
+    def strict_names(self) -> bool:
+        return self._strict_names
+
+    # --- helpers --- #
+
+    def _map(self, fn: Callable[[ServerManager], T]) -> list[T]:
+        """
+        Runs fn on every root in parallel, returning the results in root order.
+        """
+        if len(self._managers) == 1:
+            return [fn(self._managers[0])]
+        with ThreadPoolExecutor(
+            max_workers=len(self._managers), thread_name_prefix="kherimoya-federation"
+        ) as pool:
+            return list(pool.map(fn, self._managers))
+
+    def manager_for(self, server: KherimoyaServer) -> ServerManager:
+        """
+        The ServerManager (root) which the given server lives in.
+        """
+        for manager in self._managers:
+            if server.path.is_relative_to(manager.servers_path):
+                return manager
+        raise exceptions.ServerNotInPathError(
+            f"Server is not in any of the federated roots: {server.path}"
+        )
+
+    def _pick_root(self, template: str | None = None) -> ServerManager:
+        candidates = self._managers
+        if template is not None:
+            candidates = [m for m in self._managers if m.templates.has(template)]
+            if not candidates:
+                raise exceptions.ServerCreationError(
+                    f"Template '{template}' does not exist in any root."
+                )
+
+        def score(manager: ServerManager) -> tuple:
+            manager.project_path.mkdir(parents=True, exist_ok=True)
+            free = shutil.disk_usage(manager.project_path).free
+            if self._placement == "io_load":
+                in_flight = _fs.io_in_flight(manager.project_path)
+                # unknown load sorts after every known one; free space breaks ties
+                return (in_flight is None, in_flight or 0, -free)
+            return (-free,)
+
+        scores = self._map(score)
+        manager = min(
+            candidates, key=lambda m: scores[self._managers.index(m)]
+        )
+        self.logger.debug(f"Placing new server on {manager.project_path}")
+        return manager
+
+    # --- methods --- #
+
+    def rebuild_registry(self) -> None:
+        self._map(lambda manager: manager.rebuild_registry())
+
+    def list_server_ids(self) -> list[str | None]:
+        """
+        Lists all of the server IDs in every root.
+        """
+        return [i for ids in self._map(ServerManager.list_server_ids) for i in ids]
+
+    def list_server_names(self) -> list[str]:
+        """
+        Lists all of the server names in every root.
+        """
+        return [n for names in self._map(ServerManager.list_server_names) for n in names]
+
+    def list_server_objects(self) -> list[KherimoyaServer]:
+        """
+        Lists all of the servers in every root as KherimoyaServer objects, enumerating the roots in parallel.
+        """
+        return [s for servers in self._map(ServerManager.list_server_objects) for s in servers]
+
+    def get_server_by_id(self, server_id: str) -> KherimoyaServer | None:
+        """
+        Gets a KherimoyaServer by its ID from whichever root has it.
+        """
+        for manager in self._managers:
+            server = manager.get_server_by_id(server_id)
+            if server is not None:
+                return server
+        return None
+
+    def find_servers(self, **kwargs) -> list[KherimoyaServer]:
+        """
+        Same as ServerManager.find_servers, across every root.
+        """
+        return [s for servers in self._map(lambda m: m.find_servers(**kwargs)) for s in servers]
+
+    def create_server(
+        self,
+        server: str | KherimoyaServer,
+        install_timeout: float | None = 300,
+        method: Literal["python", "docker"] = "python",
+        template: str | None = None,
+        resume: bool = False,
+    ) -> KherimoyaServer:
+        """
+        Creates a new server on the root with the most free space (or least I/O load, see placement).
+
+        Args:
+            server (str | KherimoyaServer): A name for the server, or a nonexisting KherimoyaServer
+            install_timeout (float | None = 300): Maximum seconds to wait for endstone to finish initial install/start.
+            template (str | None = None): Template to clone the server from. Templates belong to a root, so only roots
+                which have it are considered.
+            resume (bool = False): See ServerManager.create_server; an unfinished creation is resumed in its own root.
+
+        Returns:
+            KherimoyaServer: The new, existing server.
+        """
+        name = server.name if isinstance(server, KherimoyaServer) else server
+        if resume:
+            for manager in self._managers:
+                if manager.get_incomplete_server(name) is not None:
+                    return manager.create_server(
+                        name, install_timeout=install_timeout, method=method, resume=True
+                    )
+
+        if self.strict_names and any(m._name_taken(name) for m in self._managers):
+            raise exceptions.ServerCreationError(
+                f"Server with name '{name}' already exists, and strict_names is enabled."
+            )
+
+        manager = self._pick_root(template)
+        if isinstance(server, KherimoyaServer) and not server.path.is_relative_to(
+            manager.servers_path
+        ):
+            server = server.name  # placeholder for another root, only keep its name
+
+        with self._reserved_elsewhere(name, manager, exceptions.ServerCreationError):
+            return manager.create_server(
+                server, install_timeout=install_timeout, method=method, template=template
+            )
+
+    @contextmanager
+    def _reserved_elsewhere(
+        self, name: str, target: ServerManager, error: type[Exception]
+    ) -> Iterator[None]:
+        """
+        Holds a reservation on a server name in every root except `target` (which reserves it itself while creating or
+        renaming), if strict_names is enabled. Together, that keeps another process from taking the name in any root
+        between the check and the server being registered.
+        """
+        if not self.strict_names:
+            yield
+            return
+
+        reserved: list[ServerManager] = []
+        try:
+            for manager in self._managers:
+                if manager is target:
+                    continue
+                if not manager.registry.reserve_name(name):
+                    raise error(
+                        f"Server with name '{name}' already exists (or is being created), and strict_names is enabled."
+                    )
+                reserved.append(manager)
+            yield
+        finally:
+            for manager in reserved:
+                manager.registry.release_name(name)
+
+    def delete_server(self, server: KherimoyaServer) -> None:
+        self.manager_for(server).delete_server(server)
+
+    def rename_server(self, server: KherimoyaServer, new_name: str) -> None:
+        if self.strict_names and any(m._name_taken(new_name) for m in self._managers):
+            raise exceptions.ServerRenameError(
+                f"Server with name '{new_name}' already exists, and strict_names is enabled."
+            )
+        manager = self.manager_for(server)
+        with self._reserved_elsewhere(new_name, manager, exceptions.ServerRenameError):
+            manager.rename_server(server, new_name)
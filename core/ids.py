@@ -0,0 +1,356 @@
+"""Server ID allocation."""
+
+import fcntl
+import os
+from pathlib import Path
+import secrets
+import threading
+from typing import Callable, Iterable
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+GROUP_SIZE = 4
+SPACE_SIZE = len(ALPHABET) ** GROUP_SIZE  # possible 1-group IDs
+
+_BLOCK_SIZE = 4096  # bytes of bitmap per block
+_FREE_BYTES = bytes(0 if b == 0xFF else 1 for b in range(256))  # translate table: nonzero where a byte has a free bit
+_CHAR_VALUES = {c: i for i, c in enumerate(ALPHABET)}
+
+
+def id_to_index(server_id: str) -> int | None:
+    """
+    The position of a 1-group ID (e.g. "ab3x") in the bitmap, or None for any other ID.
+    """
+    if len(server_id) != GROUP_SIZE:
+        return None
+    index = 0
+    for c in server_id.lower():
+        value = _CHAR_VALUES.get(c)
+        if value is None:
+            return None
+        index = index * len(ALPHABET) + value
+    return index
+
+
+def index_to_id(index: int) -> str:
+    chars = []
+    for _ in range(GROUP_SIZE):
+        index, value = divmod(index, len(ALPHABET))
+        chars.append(ALPHABET[value])
+    return "".join(reversed(chars))
+
+
+def random_id(groups: int) -> str:
+    return "-".join(
+        "".join(secrets.choice(ALPHABET) for _ in range(GROUP_SIZE))
+        for _ in range(groups)
+    )
+
+
+class IdAllocator:
+    """
+    Hands out free server IDs using an occupancy bitmap over the 1-group (4 character base36) ID space.
+
+    The bitmap is 36^4 bits (~205 KiB), persisted next to the registry and updated one byte at a time, read-modify-write
+    under an flock so processes sharing it don't undo each other's bits. Per-block free counts let allocation go
+    straight to a block with room in it, so allocating stays O(1) even when the space is almost full, and moving on to
+    2-group IDs once it's full is a counter comparison.
+
+    Only IDs of registered servers are marked. The bitmap is still only a hint: every candidate is checked with `taken`
+    (e.g. against the registry), so a bitmap which is stale (e.g. because another process created servers since it was
+    read) costs a retry, never a duplicate ID.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.RLock()
+        self._bits = bytearray((SPACE_SIZE + 7) // 8)
+        self._block_free: list[int] = []
+        self._used = 0
+        self._fd: int | None = None
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def used(self) -> int:
+        """
+        Number of 1-group IDs in use.
+        """
+        return self._used
+
+    # --- persistence --- #
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        return self._fd
+
+    def _recount(self) -> None:
+        self._used = int.from_bytes(self._bits, "little").bit_count()
+        self._block_free = []
+        for start in range(0, len(self._bits), _BLOCK_SIZE):
+            block = self._bits[start : start + _BLOCK_SIZE]
+            bits = min(len(block) * 8, SPACE_SIZE - start * 8)
+            self._block_free.append(bits - int.from_bytes(block, "little").bit_count())
+
+    @staticmethod
+    def _bitmap_of(server_ids: Iterable[str | None]) -> bytearray:
+        bits = bytearray((SPACE_SIZE + 7) // 8)
+        for server_id in server_ids:
+            index = id_to_index(server_id or "")
+            if index is not None:
+                bits[index >> 3] |= 1 << (index & 7)
+        return bits
+
+    def _write_all(self, fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            os.pwrite(fd, self._bits, 0)
+            os.ftruncate(fd, len(self._bits))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def load(self, server_ids: Iterable[str | None] | None = None) -> bool:
+        """
+        Loads the bitmap from disk.
+
+        Args:
+            server_ids (Iterable[str | None] | None = None): Every server ID in use (e.g. from the registry). If given,
+                the bitmap is reconciled with them, and written back if it had drifted.
+
+        Returns:
+            bool: False if there was no (valid) bitmap on disk, in which case rebuild should be called.
+        """
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                data = os.pread(fd, len(self._bits) + 1, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            if len(data) != len(self._bits):
+                return False
+            self._bits[:] = data
+
+            if server_ids is not None:
+                expected = self._bitmap_of(server_ids)
+                if expected != self._bits:
+                    self._bits[:] = expected
+                    self._write_all(fd)
+
+            self._recount()
+            self._loaded = True
+            return True
+
+    def rebuild(self, server_ids: Iterable[str | None]) -> None:
+        """
+        Rebuilds the bitmap from every server ID in use, and writes it to disk.
+        """
+        with self._lock:
+            self._bits[:] = self._bitmap_of(server_ids)
+            self._recount()
+            self._write_all(self._open())
+            self._loaded = True
+
+    def _set(self, index: int, used: bool) -> None:
+        byte, bit = index >> 3, 1 << (index & 7)
+        fd = self._open()
+        # from the file rather than memory, which misses what other processes changed since it was loaded
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            current = os.pread(fd, 1, byte)
+            old = current[0] if current else 0
+            value = old | bit if used else old & ~bit
+            if value != old:
+                os.pwrite(fd, bytes((value,)), byte)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        delta = value.bit_count() - self._bits[byte].bit_count()
+        self._bits[byte] = value
+        self._used += delta
+        self._block_free[byte // _BLOCK_SIZE] -= delta
+
+    def mark(self, server_id: str) -> None:
+        """
+        Marks an ID as used. IDs which aren't 1-group IDs are ignored.
+        """
+        index = id_to_index(server_id)
+        if index is not None and self._loaded:
+            with self._lock:
+                self._set(index, True)
+
+    def release(self, server_id: str) -> None:
+        """
+        Marks an ID as free again.
+        """
+        index = id_to_index(server_id)
+        if index is not None and self._loaded:
+            with self._lock:
+                self._set(index, False)
+
+    # --- allocation --- #
+
+    def _free_index(self) -> int | None:
+        """
+        A random free index, or None if the 1-group space is full.
+        """
+        if self._used >= SPACE_SIZE:
+            return None
+
+        # random probes find a free ID right away unless the space is nearly full
+        for _ in range(8):
+            index = secrets.randbelow(SPACE_SIZE)
+            if not self._bits[index >> 3] & (1 << (index & 7)):
+                return index
+
+        # otherwise go to a random block which still has room, and to a random free byte in it
+        blocks = [i for i, free in enumerate(self._block_free) if free > 0]
+        if not blocks:
+            return None
+        block = secrets.choice(blocks)
+        start = block * _BLOCK_SIZE
+        free_bytes = self._bits[start : start + _BLOCK_SIZE].translate(_FREE_BYTES)
+        offset = secrets.randbelow(len(free_bytes))
+        found = free_bytes.find(1, offset)
+        if found < 0:
+            found = free_bytes.find(1)
+
+        byte = start + found
+        for bit in range(8):
+            index = byte * 8 + bit
+            if index < SPACE_SIZE and not self._bits[byte] & (1 << bit):
+                return index
+        return None  # unreachable unless the counts are off
+
+    def allocate(
+        self,
+        taken: Callable[[str], bool],
+        registered: Callable[[str], bool] | None = None,
+        max_random_tries: int = 1000,
+    ) -> str | None:
+        """
+        Finds the shortest free ID possible. It isn't marked as used, that's up to whoever registers a server with it
+        (see mark).
+
+        Args:
+            taken (Callable[[str], bool]): Tells whether an ID can't be used (the source of truth), e.g. because a server
+                has it or another process reserved it.
+            registered (Callable[[str], bool] | None = None): Tells whether an ID which was taken belongs to a server,
+                in which case the stale bitmap is corrected. IDs taken for any other reason are only skipped.
+            max_random_tries (int = 1000): How many candidates to try per group count before moving on.
+
+        Returns:
+            str | None: The new ID, or None if no free ID was found.
+        """
+        with self._lock:
+            for _ in range(max_random_tries):
+                index = self._free_index()
+                if index is None:
+                    break  # full, on to 2-group IDs
+                candidate = index_to_id(index)
+                if not taken(candidate):
+                    return candidate
+                if registered is not None and registered(candidate):
+                    self._set(index, True)  # the bitmap was stale
+
+        # IDs with more than one group aren't in the bitmap, the space is large enough that random candidates just work
+        for groups in range(2, 10):
+            for _ in range(max_random_tries):
+                candidate = random_id(groups)
+                if not taken(candidate):
+                    return candidate
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class IdReservations:
+    """
+    Cross-process reservations of server IDs, as O_EXCL-created files in a shared directory.
+
+    A process reserves an ID before it checks the registry for it, and only releases it after the server using it was
+    registered. So any two processes trying the same ID either collide on the reservation file or the second one sees
+    the first one's server in the registry, with no global lock. Reservations of processes which died are reclaimed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._held: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _file(self, server_id: str) -> Path:
+        return self._path / server_id.lower()
+
+    @staticmethod
+    def _owner_alive(file: Path) -> bool:
+        try:
+            pid = int(file.read_text(encoding="utf-8").strip() or 0)
+        except (OSError, ValueError):
+            return True  # being written right now, or unreadable; leave it alone
+        if pid <= 0:
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def reserve(self, server_id: str) -> bool:
+        """
+        Reserves an ID for this process.
+
+        Returns:
+            bool: True if it was reserved, False if someone else holds it.
+        """
+        file = self._file(server_id)
+        self._path.mkdir(parents=True, exist_ok=True)
+
+        for _ in range(2):
+            try:
+                fd = os.open(file, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o644)
+            except FileExistsError:
+                if self._owner_alive(file):
+                    return False
+                try:
+                    file.unlink()  # stale, take it over
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+            with self._lock:
+                self._held.add(server_id.lower())
+            return True
+        return False
+
+    def held(self, server_id: str) -> bool:
+        """
+        Whether or not a live process (this one included) holds a reservation on an ID, i.e. is creating a server with
+        it which isn't registered yet.
+        """
+        file = self._file(server_id)
+        return file.exists() and self._owner_alive(file)
+
+    def release(self, server_id: str) -> None:
+        """
+        Releases an ID reserved by this process. Does nothing if it isn't held by this process.
+        """
+        key = server_id.lower()
+        with self._lock:
+            if key not in self._held:
+                return
+            self._held.discard(key)
+        try:
+            self._file(server_id).unlink()
+        except FileNotFoundError:
+            pass
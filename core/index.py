@@ -0,0 +1,224 @@
+"""In-memory indexes over the servers known to a ServerManager."""
+
+from bisect import bisect_left, insort
+from collections import Counter
+import difflib
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from .registry import RegistryEntry
+
+if TYPE_CHECKING:
+    from .servers import KherimoyaServer
+
+
+class ServerIndex:
+    """
+    Identity map of the servers known to a ServerManager.
+
+    Servers are keyed by their path relative to servers/ and by their case-folded ID. The index is filled once
+    (lazily, from the registry) and then updated incrementally, so repeated lookups return the same KherimoyaServer object.
+
+    Case-folded IDs and names are also kept in sorted arrays, so prefix lookups are a bisect.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._by_path: dict[str, "KherimoyaServer"] = {}
+        self._by_id: dict[str, list["KherimoyaServer"]] = {}
+        self._keys: dict[str, tuple[str, str, str]] = {}  # path -> (id key, name key, name) it was inserted with
+        self._names: Counter[str] = Counter()
+        self._sorted_ids: list[tuple[str, str]] = []  # (id key, path)
+        self._sorted_names: list[tuple[str, str]] = []  # (name key, path)
+
+    @staticmethod
+    def _key(server_id: str) -> str:
+        return server_id.casefold()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(
+        self,
+        entries: Iterable[RegistryEntry],
+        factory: Callable[[RegistryEntry], "KherimoyaServer"],
+    ) -> None:
+        """
+        Fills the index from registry entries. Servers which are already in the index (same path, name & ID) are kept as-is.
+
+        Args:
+            entries (Iterable[RegistryEntry]): Every server in the registry.
+            factory (Callable[[RegistryEntry], KherimoyaServer]): Builds a KherimoyaServer from an entry. Entries it raises for are skipped.
+        """
+        with self._lock:
+            previous = self._by_path
+            self._by_path = {}
+            self._by_id = {}
+            self._keys = {}
+            self._names = Counter()
+            self._sorted_ids = []
+            self._sorted_names = []
+
+            for entry in entries:
+                server = previous.get(entry.path)
+                if (
+                    server is None
+                    or server.name != entry.name
+                    or server.server_id != entry.server_id
+                ):
+                    try:
+                        server = factory(entry)
+                    except Exception:
+                        continue
+                self._insert(entry.path, server)
+
+            self._loaded = True
+
+    def invalidate(self) -> None:
+        """
+        Marks the index as needing to be loaded again. Existing objects are reused by the next load.
+        """
+        with self._lock:
+            self._loaded = False
+
+    def _insert(self, path: str, server: "KherimoyaServer") -> None:
+        id_key = self._key(server.server_id or "")
+        name_key = self._key(server.name)
+
+        self._by_path[path] = server
+        self._keys[path] = (id_key, name_key, server.name)
+        self._names[server.name] += 1
+        self._by_id.setdefault(id_key, []).append(server)
+        insort(self._sorted_ids, (id_key, path))
+        insort(self._sorted_names, (name_key, path))
+
+    @staticmethod
+    def _remove_sorted(array: list[tuple[str, str]], item: tuple[str, str]) -> None:
+        i = bisect_left(array, item)
+        if i < len(array) and array[i] == item:
+            del array[i]
+
+    def _discard(self, path: str) -> "KherimoyaServer | None":
+        # the server's name & ID may have changed since it was inserted, so use the keys it was inserted with
+        server = self._by_path.pop(path, None)
+        if server is None:
+            return None
+        id_key, name_key, name = self._keys.pop(path)
+        self._names[name] -= 1
+        if self._names[name] <= 0:
+            del self._names[name]
+
+        bucket = self._by_id.get(id_key, [])
+        if server in bucket:
+            bucket.remove(server)
+        if not bucket:
+            self._by_id.pop(id_key, None)
+        self._remove_sorted(self._sorted_ids, (id_key, path))
+        self._remove_sorted(self._sorted_names, (name_key, path))
+        return server
+
+    def add(
+        self, path: str, server: "KherimoyaServer", old_path: str | None = None
+    ) -> None:
+        """
+        Adds a server, or moves it if `old_path` is given (renamed or given a new ID).
+        """
+        with self._lock:
+            if old_path is not None:
+                self._discard(old_path)
+            self._discard(path)
+            self._insert(path, server)
+
+    def remove(self, path: str) -> "KherimoyaServer | None":
+        """
+        Removes the server at the given relative path, returning it if it was in the index.
+        """
+        with self._lock:
+            return self._discard(path)
+
+    def has_name(self, name: str) -> bool:
+        """
+        Whether or not a server with exactly this name is in the index.
+        """
+        return name in self._names
+
+    def get_by_path(self, path: str) -> "KherimoyaServer | None":
+        """
+        Gets a server by its path relative to servers/.
+        """
+        return self._by_path.get(path)
+
+    def get(self, server_id: str) -> "KherimoyaServer | None":
+        """
+        Gets a server by its ID (case-insensitive).
+        """
+        servers = self._by_id.get(self._key(server_id))
+        return servers[0] if servers else None
+
+    @staticmethod
+    def _prefixed(array: list[tuple[str, str]], prefix: str) -> Iterable[tuple[str, str]]:
+        i = bisect_left(array, (prefix, ""))
+        while i < len(array) and array[i][0].startswith(prefix):
+            yield array[i]
+            i += 1
+
+    def find(
+        self,
+        prefix: str | None = None,
+        fuzzy: str | None = None,
+        ids: bool = True,
+        names: bool = True,
+        limit: int | None = None,
+    ) -> list["KherimoyaServer"]:
+        """
+        Finds servers by ID and/or name (case-insensitive). Exact matches come first, then prefix matches, then fuzzy ones.
+
+        Args:
+            prefix (str | None = None): Match IDs/names starting with this.
+            fuzzy (str | None = None): Match IDs/names which are close to this (see difflib.get_close_matches).
+            ids (bool = True): Whether or not to match IDs.
+            names (bool = True): Whether or not to match names.
+            limit (int | None = None): Maximum number of servers to return.
+        """
+        arrays = []
+        if ids:
+            arrays.append(self._sorted_ids)
+        if names:
+            arrays.append(self._sorted_names)
+
+        with self._lock:
+            exact: list[str] = []
+            prefixed: list[str] = []
+            if prefix is not None:
+                key = self._key(prefix)
+                for array in arrays:
+                    for k, path in self._prefixed(array, key):
+                        (exact if k == key else prefixed).append(path)
+
+            close: list[str] = []
+            if fuzzy is not None:
+                key = self._key(fuzzy)
+                for array in arrays:
+                    keys = sorted({k for k, _ in array})
+                    for match in difflib.get_close_matches(key, keys, n=10, cutoff=0.6):
+                        close.extend(p for k, p in self._prefixed(array, match) if k == match)
+
+            results = []
+            seen = set()
+            for path in exact + prefixed + close:
+                if path in seen:
+                    continue
+                seen.add(path)
+                results.append(self._by_path[path])
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def values(self) -> list["KherimoyaServer"]:
+        with self._lock:
+            return list(self._by_path.values())
+
+    def __len__(self) -> int:
+        return len(self._by_path)
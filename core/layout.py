@@ -0,0 +1,129 @@
+"""
+Server directory layouts.
+
+- "flat" (default): every server is a direct child of servers/, e.g. servers/name@abcd
+- "sharded": servers are spread over two levels of hashed directories derived from their ID, e.g. servers/3f/a2/name@abcd,
+  which keeps every directory small for very large fleets
+
+The layout of a project is stored in servers/.kherimoya-layout. Scanning always understands both layouts, so a
+half-migrated tree is still read correctly.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterator, Literal, cast
+
+from .constants import DELIMITER, LAYOUT_FILE
+
+Layout = Literal["flat", "sharded"]
+LAYOUTS: tuple[Layout, ...] = ("flat", "sharded")
+
+_HEX = frozenset("0123456789abcdef")
+# servers/ path -> (inode, mtime and size of its layout file, or None without one; the layout read from it)
+_cache: dict[str, tuple[tuple[int, int, int] | None, Layout]] = {}
+
+
+def is_shard_name(name: str) -> bool:
+    return len(name) == 2 and set(name) <= _HEX
+
+
+def shard_for(server_id: str) -> tuple[str, str]:
+    """
+    The two shard directories a server with the given ID lives in, in the sharded layout.
+    """
+    digest = hashlib.sha1(server_id.lower().encode("utf-8")).hexdigest()
+    return digest[0:2], digest[2:4]
+
+
+def relative_server_path(name: str, server_id: str, layout: Layout) -> str:
+    """
+    The path of a server relative to servers/, e.g. "name@abcd" or "3f/a2/name@abcd".
+    """
+    dirname = f"{name}{DELIMITER}{server_id}"
+    if layout == "sharded":
+        return "/".join((*shard_for(server_id), dirname))
+    return dirname
+
+
+def read_layout(servers_path: Path) -> Layout:
+    """
+    The layout of the given servers/ directory. Cached until the layout file changes (e.g. another process migrated the
+    layout), which costs a stat per call instead of a read.
+    """
+    key = os.path.abspath(servers_path)
+    try:
+        st = os.stat(servers_path / LAYOUT_FILE)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        value = (servers_path / LAYOUT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        value = "flat"
+    layout = cast(Layout, value if value in LAYOUTS else "flat")
+    _cache[key] = (stamp, layout)
+    return layout
+
+
+def write_layout(servers_path: Path, layout: Layout) -> None:
+    servers_path.mkdir(parents=True, exist_ok=True)
+    # replaced rather than rewritten, so the file gets a new inode and every process' cached layout goes stale
+    tmp = servers_path / f".{LAYOUT_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(layout + "\n", encoding="utf-8")
+    os.replace(tmp, servers_path / LAYOUT_FILE)
+
+
+def is_server_path(path: Path) -> bool:
+    """
+    Whether or not the path is where a server directory can be (directly in servers/, or in its shard), in either layout.
+    """
+    if path.parent.name == "servers":
+        return True
+    return (
+        path.parent.parent.parent.name == "servers"
+        and is_shard_name(path.parent.name)
+        and is_shard_name(path.parent.parent.name)
+    )
+
+
+def iter_server_dirs(servers_path: Path) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    Yields (relative path, entry) for every directory in servers/ (in either layout) whose name contains DELIMITER.
+    """
+
+    def scan(path: str, prefix: str, depth: int) -> Iterator[tuple[str, os.DirEntry]]:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                if DELIMITER in entry.name:
+                    yield prefix + entry.name, entry
+                elif depth < 2 and is_shard_name(entry.name):
+                    yield from scan(entry.path, f"{prefix}{entry.name}/", depth + 1)
+
+    if servers_path.is_dir():
+        yield from scan(str(servers_path), "", 0)
+
+
+def prune_empty_shards(servers_path: Path) -> None:
+    """
+    Removes shard directories which no longer hold any servers.
+    """
+    for first in list(os.scandir(servers_path)):
+        if not first.is_dir() or not is_shard_name(first.name):
+            continue
+        for second in list(os.scandir(first.path)):
+            if second.is_dir() and is_shard_name(second.name):
+                try:
+                    os.rmdir(second.path)
+                except OSError:
+                    pass  # not empty
+        try:
+            os.rmdir(first.path)
+        except OSError:
+            pass
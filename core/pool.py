@@ -0,0 +1,187 @@
+"""Warm pool of pre-created, stopped spare servers, handed out by ServerManager.claim_server."""
+
+import logging
+import os
+import secrets
+import threading
+from typing import TYPE_CHECKING
+
+from . import _fs
+
+if TYPE_CHECKING:
+    from .servers import ServerManager
+
+SPARE_PREFIX = "_spare_"  # names of spare servers start with this
+
+
+def spare_name() -> str:
+    return f"{SPARE_PREFIX}{secrets.token_hex(4)}"
+
+
+def is_spare_name(name: str) -> bool:
+    return name.startswith(SPARE_PREFIX)
+
+
+class WarmPool:
+    """
+    Keeps `size` spare servers around, topping the pool back up in a background thread.
+
+    Spares are ordinary stopped servers named _spare_<random>; ServerManager.claim_server renames one to the requested
+    name, which is instant. The refiller only creates a spare while the machine is below the CPU and I/O budget, one at
+    a time, so it never competes with the servers which are actually in use.
+    """
+
+    def __init__(
+        self,
+        manager: "ServerManager",
+        size: int,
+        template: str | None = None,
+        install_timeout: float | None = 300,
+        max_load: float = 0.75,
+        max_io_in_flight: int | None = None,
+        interval: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            manager (ServerManager): The ServerManager whose servers/ the spares are created in.
+            size (int): Number of spares to keep around.
+            template (str | None = None): Template to clone spares from (see ServerManager.save_template), which is
+                much cheaper than installing each one.
+            install_timeout (float | None = 300): See ServerManager.create_server.
+            max_load (float = 0.75): Only create spares while the 1 minute load average per CPU is below this.
+            max_io_in_flight (int | None = None): Only create spares while the disk holding servers/ has fewer I/O
+                requests in flight than this. If None, I/O load isn't checked.
+            interval (float = 30.0): Seconds between checks of the pool when nothing is claimed.
+        """
+        if size < 0:
+            raise ValueError("size must not be negative")
+
+        self._manager = manager
+        self._size = size
+        self._template = template
+        self._install_timeout = install_timeout
+        self._max_load = max_load
+        self._max_io_in_flight = max_io_in_flight
+        self._interval = interval
+        self.logger = logging.getLogger(__name__)
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def template(self) -> str | None:
+        return self._template
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def within_budget(self) -> bool:
+        """
+        Whether or not the machine is idle enough to create a spare right now.
+        """
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            load = 0.0
+        if load >= self._max_load:
+            self.logger.debug(f"Not refilling warm pool, load per CPU is {load:.2f}")
+            return False
+
+        if self._max_io_in_flight is not None:
+            in_flight = _fs.io_in_flight(self._manager.servers_path)
+            if in_flight is not None and in_flight >= self._max_io_in_flight:
+                self.logger.debug(f"Not refilling warm pool, {in_flight} I/O requests in flight")
+                return False
+        return True
+
+    def missing(self) -> int:
+        """
+        Number of spares needed to fill the pool. Spares which are still being created count too, so a slow creation
+        doesn't make the pool start another one.
+        """
+        spares = sum(1 for _ in self._manager.iter_servers(name_prefix=SPARE_PREFIX))
+        return max(0, self._size - spares)
+
+    def refill(self, max_new: int | None = None) -> int:
+        """
+        Creates spares until the pool is full, the budget is exceeded, or `max_new` were created.
+
+        Returns:
+            int: Number of spares created.
+        """
+        created = 0
+        while (
+            not self._stop.is_set()
+            and (max_new is None or created < max_new)
+            and self.missing() > 0
+            and self.within_budget()
+        ):
+            name = spare_name()
+            try:
+                self._manager._create_server(  # create_server refuses spare names
+                    name,
+                    install_timeout=self._install_timeout,
+                    template=self._template,
+                )
+            except Exception as e:
+                self.logger.warning(f"Failed to create a spare server: {e!r}")
+                self._discard(name)
+                break
+            created += 1
+        if created:
+            self.logger.info(f"Created {created} spare servers")
+        return created
+
+    def _discard(self, name: str) -> None:
+        """
+        Deletes what a failed creation of a spare left behind, so failing creations don't pile up incomplete spares.
+        """
+        try:
+            spare = self._manager.get_incomplete_server(name)
+            if spare is not None:
+                self._manager.delete_server(spare)
+        except Exception as e:
+            self.logger.warning(f"Failed to remove the incomplete spare server {name}: {e!r}")
+
+    def wake(self) -> None:
+        """
+        Makes the refiller check the pool now, e.g. right after a spare was claimed.
+        """
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception:
+                self.logger.exception("Warm pool refill failed")
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Starts refilling the pool in a background thread.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="kherimoya-warm-pool", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stops the background refiller. A spare which is being created when this is called is still finished.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,64 @@
+"""Minimal RakNet unconnected ping, to confirm a Bedrock server is accepting connections."""
+
+import os
+from pathlib import Path
+import socket
+import struct
+import time
+
+DEFAULT_PORT = 19132
+
+_UNCONNECTED_PING = 0x01
+_UNCONNECTED_PONG = 0x1C
+_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+
+
+def server_port(server_path: Path) -> int:
+    """
+    The IPv4 port of a server, from server.properties in its server/ directory.
+    """
+    try:
+        with open(server_path / "server.properties", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.strip().partition("=")
+                if key == "server-port" and value.strip().isdigit():
+                    return int(value)
+    except OSError:
+        pass
+    return DEFAULT_PORT
+
+
+def ping(host: str = "127.0.0.1", port: int = DEFAULT_PORT, timeout: float = 1.0, interval: float = 0.25) -> str | None:
+    """
+    Sends unconnected pings until the server answers, or timeout passes.
+
+    Returns:
+        str | None: The server's advertisement (MOTD, protocol, version, player counts, ...; ";"-separated), None if it
+            didn't answer.
+    """
+    guid = int.from_bytes(os.urandom(8), "big")
+    deadline = time.monotonic() + timeout
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            packet = struct.pack(">BQ", _UNCONNECTED_PING, int(time.monotonic() * 1000)) + _MAGIC
+            packet += struct.pack(">Q", guid)
+            try:
+                sock.sendto(packet, (host, port))
+            except OSError:
+                return None
+            sock.settimeout(min(interval, remaining))
+            try:
+                while True:
+                    data, _ = sock.recvfrom(2048)
+                    # id, time, server guid, magic, length-prefixed advertisement
+                    if len(data) >= 35 and data[0] == _UNCONNECTED_PONG and data[17:33] == _MAGIC:
+                        (length,) = struct.unpack_from(">H", data, 33)
+                        return data[35 : 35 + length].decode("utf-8", errors="replace")
+            except socket.timeout:
+                continue
+            except ConnectionRefusedError:
+                # nothing listening yet (an ICMP unreachable came back); try again after the interval
+                time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
@@ -0,0 +1,302 @@
+"""Persistent on-disk index of the servers in servers/."""
+
+import os
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Iterable, Iterator, NamedTuple
+
+
+class RegistryEntry(NamedTuple):
+    """
+    A single server as stored in the registry.
+
+    `path` is relative to the servers/ directory (e.g. "name@abcd"), so the registry stays valid if the project is moved.
+    """
+
+    name: str
+    server_id: str
+    path: str
+    type: str | None = None
+    state: str = "stopped"
+
+
+class ServerRegistry:
+    """
+    SQLite backed index of servers (name, id, path, type and state).
+
+    The registry is kept up to date by ServerManager whenever it creates, deletes or renames a server,
+    and can be rebuilt from the directory tree at any time with ServerManager.rebuild_registry.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS servers (
+            path TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            id TEXT NOT NULL,
+            id_key TEXT NOT NULL,
+            type TEXT,
+            state TEXT NOT NULL DEFAULT 'stopped'
+        );
+        CREATE INDEX IF NOT EXISTS servers_id_key ON servers (id_key);
+        CREATE INDEX IF NOT EXISTS servers_name ON servers (name);
+        CREATE TABLE IF NOT EXISTS name_reservations (
+            name TEXT PRIMARY KEY,
+            pid INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    # --- helpers --- #
+
+    @staticmethod
+    def _row_to_entry(row: tuple) -> RegistryEntry:
+        return RegistryEntry(
+            name=row[0], server_id=row[1], path=row[2], type=row[3], state=row[4]
+        )
+
+    def _select(self, where: str = "", params: tuple = ()) -> list[RegistryEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, id, path, type, state FROM servers {where}", params
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    # --- methods --- #
+
+    def is_built(self) -> bool:
+        """
+        Whether or not the registry has been built from the directory tree at least once.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'built'"
+            ).fetchone()
+        return row is not None and row[0] == "1"
+
+    def rebuild(self, entries: Iterable[RegistryEntry]) -> None:
+        """
+        Replaces the contents of the registry with the given entries.
+
+        Args:
+            entries (Iterable[RegistryEntry]): Every server found in servers/.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM servers")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO servers (path, name, id, id_key, type, state) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (e.path, e.name, e.server_id, e.server_id.lower(), e.type, e.state)
+                        for e in entries
+                    ),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('built', '1')"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def upsert(self, entry: RegistryEntry, old_path: str | None = None) -> None:
+        """
+        Adds or updates a server.
+
+        Args:
+            entry (RegistryEntry): The server to store.
+            old_path (str | None = None): The previous relative path of the server, if it was moved (renamed or given a new ID).
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if old_path is not None and old_path != entry.path:
+                    self._conn.execute(
+                        "DELETE FROM servers WHERE path = ?", (old_path,)
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO servers (path, name, id, id_key, type, state) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        entry.path,
+                        entry.name,
+                        entry.server_id,
+                        entry.server_id.lower(),
+                        entry.type,
+                        entry.state,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove(self, path: str) -> None:
+        """
+        Removes a server by its relative path.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM servers WHERE path = ?", (path,))
+
+    def entries(self) -> list[RegistryEntry]:
+        """
+        Returns every server in the registry, ordered by path.
+        """
+        return self._select("ORDER BY path")
+
+    def iter_entries(
+        self,
+        after: str | None = None,
+        name_prefix: str | None = None,
+        server_type: str | None = None,
+        state: str | None = None,
+        batch_size: int = 256,
+    ) -> Iterator[RegistryEntry]:
+        """
+        Lazily yields servers ordered by ID (case-insensitive), fetching `batch_size` rows at a time.
+
+        Args:
+            after (str | None = None): Only yield servers whose ID sorts after this one (keyset pagination).
+            name_prefix (str | None = None): Only yield servers whose name starts with this.
+            server_type (str | None = None): Only yield servers of this type.
+            state (str | None = None): Only yield servers in this state ("running", "stopped", or "creating").
+        """
+        filters = []
+        params: list = []
+        if name_prefix:
+            filters.append("name >= ? AND name < ?")
+            params += [name_prefix, name_prefix + chr(0x10FFFF)]
+        if server_type is not None:
+            filters.append("type = ?")
+            params.append(server_type)
+        if state is not None:
+            filters.append("state = ?")
+            params.append(state)
+
+        last = (after.lower(), chr(0x10FFFF)) if after is not None else None
+        while True:
+            where = list(filters)
+            page_params = list(params)
+            if last is not None:
+                where.append("(id_key > ? OR (id_key = ? AND path > ?))")
+                page_params += [last[0], last[0], last[1]]
+
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT name, id, path, type, state, id_key FROM servers "
+                    + (f"WHERE {' AND '.join(where)} " if where else "")
+                    + "ORDER BY id_key, path LIMIT ?",
+                    (*page_params, batch_size),
+                ).fetchall()
+
+            for row in rows:
+                yield self._row_to_entry(row)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][5], rows[-1][2])
+
+    def get_by_id(self, server_id: str) -> RegistryEntry | None:
+        """
+        Gets a server by its ID (case-insensitive).
+        """
+        entries = self.entries_by_id(server_id)
+        return entries[0] if entries else None
+
+    def entries_by_id(self, server_id: str) -> list[RegistryEntry]:
+        """
+        Gets every server with the given ID (case-insensitive). There should only be one unless there are ID conflicts.
+        """
+        return self._select(
+            "WHERE id_key = ? ORDER BY path", (server_id.lower(),)
+        )
+
+    def get_by_path(self, path: str) -> RegistryEntry | None:
+        """
+        Gets a server by its relative path.
+        """
+        entries = self._select("WHERE path = ?", (path,))
+        return entries[0] if entries else None
+
+    def duplicate_ids(self) -> list[str]:
+        """
+        Returns the (lowercased) IDs which are used by more than one server.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id_key FROM servers GROUP BY id_key HAVING COUNT(*) > 1"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def reserve_name(self, name: str) -> bool:
+        """
+        Atomically reserves a server name, across threads and processes sharing this registry.
+
+        Fails if a server already has the name, or another live process reserved it. Release it with release_name once
+        the server has been registered (or creating it failed).
+
+        Returns:
+            bool: True if the name was reserved, False if it's taken.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                taken = self._conn.execute(
+                    "SELECT 1 FROM servers WHERE name = ? LIMIT 1", (name,)
+                ).fetchone()
+                reservation = self._conn.execute(
+                    "SELECT pid FROM name_reservations WHERE name = ?", (name,)
+                ).fetchone()
+                if reservation is not None and not self._pid_alive(reservation[0]):
+                    reservation = None  # left behind by a process which died
+                if taken or reservation is not None:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO name_reservations (name, pid) VALUES (?, ?)",
+                    (name, os.getpid()),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def release_name(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM name_reservations WHERE name = ? AND pid = ?",
+                (name, os.getpid()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
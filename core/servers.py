@@ -1,20 +1,57 @@
 """Kherimoya server management classes and methods."""
 
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+import os
 import shutil
 from . import exceptions
 import uuid
 import json
-import libtmux
-from typing import Literal, cast
-import re
-import secrets
+import shlex
+import signal
+import threading
+from typing import Callable, Iterable, Iterator, Literal, cast
 import time
 import sys
 import logging
 import platform
 import yaml
-from .constants import DELIMITER
+from .constants import (
+    DELIMITER,
+    STATE_DIR,
+    REGISTRY_FILE,
+    IDS_BITMAP_FILE,
+    RESERVATIONS_DIR,
+    CACHE_DIR,
+    TEMPLATES_DIR,
+    BLOBS_DIR,
+    ARTIFACTS_DIR,
+)
+from .artifacts import ArtifactMirror
+from .blobs import BlobStore, DedupReport
+from .cache import VERSION_FILE, InstallCache, endstone_version, minecraft_version
+from .templates import TemplateStore
+from .console import ConsoleLog, console_log_path, wait_until
+from .pool import WarmPool, SPARE_PREFIX, is_spare_name
+from .timings import MetricsSink, StageTimer
+from .tmux import TmuxControl, get_control
+from .supervisor import Supervisor, read_exit_status
+from . import _fs, raknet
+from .checkpoints import CreationCheckpoint, is_incomplete
+from . import _inotify
+from .ids import IdAllocator, IdReservations
+from . import layout
+from .layout import Layout
+from .registry import ServerRegistry, RegistryEntry
+from .index import ServerIndex
+from .bulk import OperationResult, run_bounded
+from .watcher import (
+    ServerWatcher,
+    ServerEvent,
+    ServerDeletedEvent,
+    ServerRenamedEvent,
+)
 
 try:
     import endstone  # unused, only here to ensure endstone is installed #type: ignore
@@ -24,12 +61,53 @@ except ImportError as e:
     raise e
 
 PROJECT_PATH = Path(__file__).parent.parent.resolve()
+BDS_BINARY = "bedrock_server"
+_READY_GRACE = 15  # seconds to wait for "Server started" after install, before stopping the server anyway
+READY_MARKER = "Server started"  # printed by BDS once it accepts connections
+_KILL_WAIT = 5  # seconds to wait for the session/process to go away after SIGKILL
+
 if not Path(PROJECT_PATH / "core").is_dir():
     raise exceptions.KherimoyaPathNotFoundError(
         f"Kherimoya root path could not be resolved. Expected to find core/ in {PROJECT_PATH}"
     )
 
 
+@dataclass
+class StopResult:
+    """
+    How stopping a server went.
+
+    Attributes:
+        exit_status (int | None): Endstone's exit status (128 + the signal if it was killed by one). None if it wasn't
+            waited for, or is unknown.
+        seconds (float): How long stopping took.
+        signal (str | None): The last signal it took to stop the server ("SIGTERM" or "SIGKILL"), None if "stop" did.
+    """
+
+    exit_status: int | None
+    seconds: float
+    signal: str | None = None
+
+
+def _server_running(
+    server: "KherimoyaServer", method: Literal["tmux", "supervisor"] | None = None
+) -> bool:
+    """
+    Whether or not endstone of a server is running: its supervised process lives or its tmux session exists (only
+    checking the one of `method`, if given). This is what counts, rather than the state recorded in the registry, which
+    nothing keeps up to date.
+    """
+    if method != "tmux" and Supervisor(server.path).running:
+        return True
+    if method == "supervisor":
+        return False
+    try:
+        # answered from the cached session list of the shared tmux connection
+        return get_control().has_session(f"{server.name}{DELIMITER}{server.server_id}")
+    except (exceptions.TmuxError, OSError):
+        return False  # no tmux (server) to connect to, so no tmux sessions either
+
+
 class KherimoyaServer:
     """
     Represents a server in servers/, existing or one which does not exist (to work as a placeholder).
@@ -56,23 +134,45 @@ class KherimoyaServer:
             if requires_running and not self.server.running:
                 raise exceptions.ServerNotRunningError(reason)
 
-        def start_server(self, method: Literal["tmux", "plugin"] = "tmux"):
+        def start_server(
+            self,
+            method: Literal["tmux", "supervisor", "plugin"] = "tmux",
+            wait: Literal["ready"] | None = None,
+            timeout: float | None = 120,
+            ping: bool = False,
+        ) -> float | None:
             """
             Starts the parent KherimoyaServer.
 
             Args:
-                Method (Literal["tmux", "plugin"]): Method in which is how you start the server. Screen will start the server through the screen session, and plugin will use the plugin (which is not yet implemented)
+                Method (Literal["tmux", "supervisor", "plugin"]): Method in which is how you start the server. Tmux will start the server in a tmux session, supervisor will run endstone directly as a supervised process (see supervisor.Supervisor), and plugin will use the plugin (which is not yet implemented)
+                wait (Literal["ready"] | None = None): With "ready", only return once the server accepts players, i.e. "Server started" appeared in its console (woken up by inotify). If None, return right after starting it.
+                timeout (float | None = 120): Maximum seconds to wait for the server to be ready, None to wait as long as it takes.
+                ping (bool = False): Also confirm readiness with a RakNet ping on the server's port (server-port of server.properties).
+
+            Returns:
+                float | None: With wait="ready", the seconds the server took to boot (also kept in server.boot_seconds).
+
+            Raises:
+                TimeoutError: If the server wasn't ready within timeout (it keeps running).
+                exceptions.ServerStartError: If endstone exited while booting.
             """
             self._checkserver(
                 requires_exists=True,
                 requires_running=False,
                 reason="Attempted to start a server which does NOT exist",
             )
+            if wait not in (None, "ready"):
+                raise ValueError(f"Invalid wait: {wait}")
 
             server = self.server
+            started = time.monotonic()
+            self._unshare_before_update(server)
 
             if method == "tmux":
                 self._start_through_tmux(server)
+            elif method == "supervisor":
+                self._start_through_supervisor(server)
             elif method == "plugin":
                 raise NotImplementedError(
                     "Kherimoya's plugin does not exist as of now."
@@ -81,93 +181,251 @@ class KherimoyaServer:
             else:
                 raise ValueError(f"Invalid start method: {method}")
 
+            if wait is None:
+                return None
+            return self._wait_until_ready(server, method, started, timeout, ping)
+
+        def _wait_until_ready(
+            self,
+            server: "KherimoyaServer",
+            method: Literal["tmux", "supervisor"],
+            started: float,
+            timeout: float | None,
+            ping: bool,
+        ) -> float:
+            session_name = f"{server.name}{DELIMITER}{server.server_id}"
+            deadline = None if timeout is None else started + timeout
+
+            def remaining() -> float | None:
+                return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+            console = ConsoleLog(console_log_path(server.path))
+            ready = wait_until(
+                lambda: console.seen(READY_MARKER) or console.finished,
+                watches=[(console.path, _inotify.IN_MODIFY)],
+                timeout=remaining(),
+                slow_condition=lambda: not _server_running(server, method),
+            )
+            if ready and not console.seen(READY_MARKER):
+                raise exceptions.ServerStartError(
+                    f"Endstone exited while booting server {session_name}; output:\n{console.tail()}"
+                )
+            if ready and ping:
+                left = remaining()
+                port = raknet.server_port(server.path / "server")
+                ready = raknet.ping(port=port, timeout=5.0 if left is None else left) is not None
+            if not ready:
+                raise TimeoutError(
+                    f"Server {session_name} was not ready within {timeout} seconds"
+                )
+
+            server._boot_seconds = time.monotonic() - started
+            return server._boot_seconds
+
+        @staticmethod
+        def _unshare_before_update(server) -> None:
+            """
+            If the installed Endstone runs another BDS version than the server has, Endstone updates BDS in place when
+            it starts, which would write through the hardlinks shared with the install cache, templates, blobs and
+            other servers. Those files get their own copies first.
+            """
+            supported = minecraft_version()
+            try:
+                installed = (server.path / "server" / VERSION_FILE).read_text(encoding="utf-8").strip()
+            except OSError:
+                installed = None
+            if supported is None or installed == supported:
+                return
+            try:
+                _fs.break_links(server.path / "server")
+            except OSError as e:
+                raise exceptions.ServerStartError(
+                    f"Failed to unshare the files of {server.path.name} before updating BDS to {supported}"
+                ) from e
+
         def _start_through_tmux(self, server):
             session_name = f"{server.name}{DELIMITER}{server.server_id}"
-            tmux_server = None
-            session = None
 
             base_path = server.path.resolve()
 
             try:  # start session
-                tmux_server = libtmux.Server()
-                tmux_server.cmd("set-option", "-g", "default-shell", "/bin/bash")
+                tmux = get_control()
 
                 # kill any existing session with the same name
-                try:
-                    existing = tmux_server.find_where({"session_name": session_name})
-                    if existing:
-                        existing.kill_session()
-                except Exception:
-                    pass
+                tmux.kill_session(session_name)
 
                 script_path = Path(
                     PROJECT_PATH / "core" / "_scripts" / "start_endstone.sh"
                 ).resolve()
 
-                window_command = f'bash --norc --noprofile -lc "chmod +x {script_path} && {script_path} {sys.executable} {base_path}; exit"'
+                # exec, so the script (which records the exit status, even on SIGTERM) is what the pane runs
+                window_command = f'bash --norc --noprofile -lc "chmod +x {script_path} && exec {script_path} {sys.executable} {base_path}"'
+
+                # a fresh console log for this run, which is what waiting for the boot watches
+                console = ConsoleLog(console_log_path(base_path))
+                console.create()
 
-                session = tmux_server.new_session(
-                    session_name=session_name,
+                tmux.new_session(
+                    session_name,
+                    window_command,
                     start_directory=str(base_path / "server"),
-                    window_command=window_command,
                 )
-
-                window = session.windows[0]
-                pane = window.panes[0]
+                tmux.pipe_pane(session_name, f"cat >> {shlex.quote(str(console.path))}")
             except Exception as e:
                 raise exceptions.ServerStartError(
                     f"Failed to start tmux session for server {session_name}"
                 ) from e
 
+        def _start_through_supervisor(self, server):
+            session_name = f"{server.name}{DELIMITER}{server.server_id}"
+
+            try:
+                Supervisor(server.path.resolve()).start()
+            except exceptions.ServerStartError:
+                raise
+            except Exception as e:
+                raise exceptions.ServerStartError(
+                    f"Failed to start supervised endstone for server {session_name}"
+                ) from e
+
         def _start_through_plugin(self, server):
             # TODO: When the plugin is finished, make it use the port for the server.
             # Example URI: {ip}:{port}/{name}{DELIMITER}{id}/start_server
             pass
 
-        def stop_server(self, method: Literal["tmux", "plugin"] = "tmux") -> None:
+        def stop_server(
+            self,
+            method: Literal["tmux", "supervisor", "plugin"] = "tmux",
+            wait: bool = True,
+            grace: float | None = 60,
+            escalate: bool = True,
+            term_grace: float = 10,
+        ) -> "StopResult":
             """
-            Stops the parent KherimoyaServer.
+            Stops the parent KherimoyaServer: sends it "stop", and by default waits for it to exit.
 
             Args:
-                Method (Literal["tmux", "plugin"]): Method in which is how you stop the server. Tmux will stop the server through the tmux session, and plugin will use the plugin (which is not yet implemented)
+                Method (Literal["tmux", "supervisor", "plugin"]): Method in which is how you stop the server. Tmux will stop the server through the tmux session, supervisor through the console input of the supervised process, and plugin will use the plugin (which is not yet implemented)
+                wait (bool = True): Wait for the tmux session to close (or the supervised process to exit). If False, return right after sending "stop".
+                grace (float | None = 60): Seconds the server gets to shut down by itself. If None, wait as long as it takes.
+                escalate (bool = True): If the server is still running after grace, send its process group SIGTERM, and SIGKILL term_grace seconds later.
+                term_grace (float = 10): Seconds between SIGTERM and SIGKILL.
+
+            Returns:
+                StopResult: The exit status, how long stopping took, and which signal it took (if any).
+
+            Raises:
+                exceptions.ServerNotRunningError: If the server isn't running.
+                TimeoutError: If the server is still running after grace (and the escalation, if enabled).
             """
             self._checkserver(
                 requires_exists=True,
-                requires_running=True,
+                requires_running=False,
                 reason="Attempted to stop a server which does NOT exist/is not running",
             )
 
             server = self.server
+            session_name = f"{server.name}{DELIMITER}{server.server_id}"
 
-            if method == "tmux":
-                self._stop_through_tmux(server)
-            elif method == "plugin":
+            if method == "plugin":
                 raise NotImplementedError(
                     "Kherimoya's plugin does not exist as of now."
                 )
                 # self._stop_through_plugin(server)
-            else:
+            elif method not in ("tmux", "supervisor"):
                 raise ValueError(f"Invalid stop method: {method}")
 
+            if not _server_running(server, method):
+                raise exceptions.ServerNotRunningError(
+                    "Attempted to stop a server which does NOT exist/is not running"
+                )
+
+            started = time.monotonic()
+            if method == "tmux":
+                self._stop_through_tmux(server)
+            else:
+                self._stop_through_supervisor(server)
+
+            if not wait:
+                return StopResult(exit_status=None, seconds=time.monotonic() - started)
+
+            signal_sent = None
+            exited = self._wait_for_exit(server, method, grace)
+            if not exited and escalate:
+                for sig, timeout in ((signal.SIGTERM, term_grace), (signal.SIGKILL, _KILL_WAIT)):
+                    if not self._signal(server, method, sig):
+                        exited = True  # exited by itself in the meantime
+                        break
+                    signal_sent = sig.name
+                    if self._wait_for_exit(server, method, timeout):
+                        exited = True
+                        break
+            if not exited:
+                raise TimeoutError(
+                    f"Server {session_name} did not stop within {grace} seconds"
+                    + (f" (after {signal_sent})" if signal_sent else "")
+                )
+
+            exit_status = read_exit_status(server.path)
+            if exit_status is None and signal_sent == "SIGKILL":
+                exit_status = 128 + signal.SIGKILL  # nothing was left to record it
+            return StopResult(
+                exit_status=exit_status,
+                seconds=time.monotonic() - started,
+                signal=signal_sent,
+            )
+
+        @staticmethod
+        def _wait_for_exit(
+            server: "KherimoyaServer", method: Literal["tmux", "supervisor"], timeout: float | None
+        ) -> bool:
+            if method == "supervisor":
+                return Supervisor(server.path).wait(timeout)
+            # woken up by the session change notifications of the shared tmux connection
+            return get_control().wait_session_closed(
+                f"{server.name}{DELIMITER}{server.server_id}", timeout
+            )
+
+        @staticmethod
+        def _signal(server: "KherimoyaServer", method: Literal["tmux", "supervisor"], sig: int) -> bool:
+            """
+            Signals the process group endstone runs in. Returns False if it isn't running anymore.
+            """
+            if method == "supervisor":
+                return Supervisor(server.path).signal(sig)
+            pid = get_control().pane_pid(f"{server.name}{DELIMITER}{server.server_id}")
+            if pid is None:
+                return False
+            try:
+                os.killpg(pid, sig)  # the pane's shell leads the group of the script and endstone
+            except ProcessLookupError:
+                return False
+            return True
+
         def _stop_through_tmux(self, server):
             session_name = f"{server.name}{DELIMITER}{server.server_id}"
 
             try:
-                tmux_server = libtmux.Server()
-                session = tmux_server.find_where({"session_name": session_name})
-
-                if session:
-                    window = session.windows[0]
-                    pane = window.panes[0]
+                tmux = get_control()
 
-                    pane.send_keys("stop", enter=True)
-                else:
-                    pass
+                if tmux.has_session(session_name):
+                    tmux.send_keys(session_name, "stop")
             except Exception as e:
                 raise exceptions.ServerStopError(
                     f"Failed to send stop command to tmux session for server {session_name}"
                 ) from e
-            pass
+
+        def _stop_through_supervisor(self, server):
+            session_name = f"{server.name}{DELIMITER}{server.server_id}"
+
+            try:
+                Supervisor(server.path.resolve()).send("stop")
+            except ProcessLookupError:
+                pass  # not running
+            except Exception as e:
+                raise exceptions.ServerStopError(
+                    f"Failed to send stop command to supervised endstone for server {session_name}"
+                ) from e
 
         def _stop_through_plugin(self, server):
             raise NotImplementedError
@@ -184,8 +442,12 @@ class KherimoyaServer:
         self._type = None
 
         if server_id:
+            servers_path = project_path / "servers"
             self._path = Path(
-                project_path / "servers" / f"{name}{DELIMITER}{server_id}"
+                servers_path
+                / layout.relative_server_path(
+                    name, server_id, layout.read_layout(servers_path)
+                )
             ).resolve()
             self._server_id = server_id
         else:
@@ -208,6 +470,37 @@ class KherimoyaServer:
         # Attach Actions interface
         self._actions = KherimoyaServer._Actions(self)
 
+    @classmethod
+    def _from_metadata(
+        cls,
+        project_path: Path,
+        name: str,
+        server_id: str,
+        path: Path,
+        server_type: Literal["python", "docker"] | None = None,
+        running: bool = False,
+    ) -> "KherimoyaServer":
+        """
+        Builds an existing server from already known metadata (e.g. from the registry) without touching the filesystem.
+        """
+        server = cls.__new__(cls)
+        server._project_path = project_path
+        server._name = name
+        server._server_id = server_id
+        server._path = path
+        server._type = server_type
+        server._exists = True
+        server._running = running
+        server._actions = KherimoyaServer._Actions(server)
+        return server
+
+    def _moved_to(self, path: Path) -> None:
+        """
+        Updates name, id & path after the server's directory was moved by someone else. Does not touch the filesystem.
+        """
+        self._path = path
+        self._name, self._server_id = path.name.split(DELIMITER, 1)
+
     # --- properties --- #
 
     _name: str = ""
@@ -216,6 +509,9 @@ class KherimoyaServer:
     _exists: bool = False
     _running: bool = False
     _type: Literal["python", "docker"] | None = None
+    _written_metadata: tuple[Path, dict] | None = None
+    _creation_timings: dict | None = None
+    _boot_seconds: float | None = None
 
     @property
     def name(self) -> str:
@@ -245,11 +541,28 @@ class KherimoyaServer:
     def type(self) -> Literal["python", "docker"] | None:
         return self._type
 
+    @property
+    def creation_timings(self) -> dict | None:
+        """
+        How long creating this server took: a record with the total and the seconds spent in every stage (mkdir,
+        tmux_spawn, download, server_start, world_generation, stop_wait, ...). None unless this object was returned by
+        ServerManager.create_server.
+        """
+        return self._creation_timings
+
+    @property
+    def boot_seconds(self) -> float | None:
+        """
+        How long the last start with wait="ready" took until the server accepted players. None if it wasn't waited for.
+        """
+        return self._boot_seconds
+
     # --- methods --- #
 
     def refresh(self, path: Path) -> None:
         """
-        Resets server_id, name, & path. Also writes to server.json, creating the file if it does not exist
+        Resets server_id, name, & path. Also writes to server.json, creating the file if it does not exist.
+        server.json is only written if its contents would actually change.
 
         Should be called when creating a server, changing its name, and every once in a while
         """
@@ -269,7 +582,7 @@ class KherimoyaServer:
                 f"Path passed into load_and_save_metadata_plus_self is not a directory: {path}"
             )
 
-        if path.parent.name != "servers":
+        if not layout.is_server_path(path):
             raise exceptions.ServerNotInPathError(
                 f"Path passed into load_and_save_metadata_plus_self is not in servers/"
             )
@@ -298,9 +611,21 @@ class KherimoyaServer:
             self._exists = True
             self._running = False  # TODO: Load from JSON later
 
-        # --- write to json ---
-        with open(path / "server.json", "w", encoding="utf-8") as f:
-            json.dump({"name": self._name, "id": self._server_id}, f, indent=4)
+        # --- write to json, only if something changed ---
+        metadata = {"name": self._name, "id": self._server_id}
+        if self._written_metadata == (path, metadata):
+            return
+
+        try:
+            with open(path / "server.json", "r", encoding="utf-8") as f:
+                on_disk = json.load(f)
+        except (OSError, ValueError):
+            on_disk = None
+
+        if on_disk != metadata:
+            with open(path / "server.json", "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=4)
+        self._written_metadata = (path, metadata)
 
 
 class ServerManager:
@@ -315,13 +640,58 @@ class ServerManager:
         project_path: Path,
         strict_names: bool = True,
         log_level: int = logging.INFO,
+        install_cache: bool = True,
+        dedup: bool = False,
+        metrics_sink: MetricsSink | None = None,
+        artifacts_path: Path | None = None,
+        offline: bool = False,
     ):
+        """
+        Args:
+            project_path (Path): The Kherimoya project, holding servers/.
+            strict_names (bool = True): Whether or not server names must be unique.
+            install_cache (bool = True): Whether or not new servers are populated from the shared BDS install cache
+                (see InstallCache), instead of each downloading BDS.
+            dedup (bool = False): Whether or not the immutable files of new servers are deduplicated into the blob store
+                (see BlobStore) when they are created.
+            metrics_sink (MetricsSink | None = None): Called with (event name, record) for every metric, e.g. the stage
+                timings of every created server ("server_created"). Errors it raises are logged and ignored.
+            artifacts_path (Path | None = None): The local artifact mirror (see ArtifactMirror) new servers get BDS
+                from when it isn't in the install cache. Defaults to artifacts/ in the project.
+            offline (bool = False): Whether or not to refuse creating servers which would need BDS downloaded, i.e.
+                when neither the install cache nor the artifact mirror has it.
+        """
         self._project_path = project_path
+        self._servers_path = (project_path / "servers").resolve()
         self._strict_names = strict_names
         self.logger = logging.getLogger(__name__)
 
         self.set_log_level(log_level)
 
+        self._registry = ServerRegistry(project_path / STATE_DIR / REGISTRY_FILE)
+        self._registry_built = False
+        self._index = ServerIndex()
+        self._ids = IdAllocator(project_path / STATE_DIR / IDS_BITMAP_FILE)
+        self._id_reservations = IdReservations(
+            project_path / STATE_DIR / RESERVATIONS_DIR
+        )
+        self._install_cache = (
+            InstallCache(project_path / CACHE_DIR / "bds", logger=self.logger)
+            if install_cache
+            else None
+        )
+        self._templates = TemplateStore(project_path / TEMPLATES_DIR, logger=self.logger)
+        self._blobs = BlobStore(project_path / BLOBS_DIR, logger=self.logger)
+        self._dedup_on_create = dedup
+        self._metrics_sink = metrics_sink
+        self._artifacts = ArtifactMirror(
+            artifacts_path if artifacts_path is not None else project_path / ARTIFACTS_DIR,
+            logger=self.logger,
+        )
+        self._offline = offline
+        self._warm_pool: WarmPool | None = None
+        self._claim_lock = threading.Lock()
+
     @property
     def project_path(self) -> Path:
         """
@@ -329,6 +699,13 @@ class ServerManager:
         """
         return self._project_path
 
+    @property
+    def servers_path(self) -> Path:
+        """
+        The (resolved) servers/ directory of the project.
+        """
+        return self._servers_path
+
     @property
     def strict_names(self) -> bool:
         """
@@ -336,6 +713,55 @@ class ServerManager:
         """
         return self._strict_names
 
+    @property
+    def layout(self) -> Layout:
+        """
+        The directory layout of servers/, either "flat" or "sharded". Change it with migrate_layout.
+        """
+        return layout.read_layout(self._servers_path)
+
+    @property
+    def install_cache(self) -> InstallCache | None:
+        """
+        The shared BDS install cache, or None if it is disabled.
+        """
+        return self._install_cache
+
+    @property
+    def templates(self) -> TemplateStore:
+        """
+        The golden templates new servers can be cloned from, see save_template and create_server.
+        """
+        return self._templates
+
+    @property
+    def blobs(self) -> BlobStore:
+        """
+        The content-addressed store identical server files are hardlinked to, see dedup_servers.
+        """
+        return self._blobs
+
+    @property
+    def artifacts(self) -> ArtifactMirror:
+        """
+        The local mirror of BDS zips and Endstone wheels, used to create servers without network access.
+        """
+        return self._artifacts
+
+    @property
+    def warm_pool(self) -> WarmPool | None:
+        """
+        The running warm pool of spare servers, see start_warm_pool.
+        """
+        return self._warm_pool
+
+    @property
+    def registry(self) -> ServerRegistry:
+        """
+        The on-disk server registry. The list_server_* methods should be used instead of this where possible.
+        """
+        return self._registry
+
     # --- methods --- #
 
     def set_log_level(self, level: int) -> None:
@@ -383,30 +809,312 @@ class ServerManager:
             ```
         """
 
-        servers_dir = self.project_path / "servers"
-        if not servers_dir.is_dir():
-            return []  # no servers yet
         servers = []
-        for p in servers_dir.iterdir():
-            self.logger.debug(f"Checking path in servers/: {p}")
-            if not p.is_dir():
-                continue
-            if DELIMITER in p.name:
-                self.logger.debug(
-                    f"Found non-server folder in servers/: {p.name}. Avoid making servers without a {DELIMITER} in its name, and avoid putting non-server folders in servers/."
-                )
-                name, server_id = p.name.split(DELIMITER, 1)
-            else:
-                continue  # Folders without DELIMITER are NOT considered servers
+        for entry in self._registry_entries():
             if sole_names:
-                servers.append(name)
+                servers.append(entry.name)
             elif sole_ids:
-                servers.append(server_id)
+                servers.append(entry.server_id)
             else:
-                servers.append((name, server_id))
-                self.logger.debug(f"Found server: {name}{DELIMITER}{server_id}")
+                servers.append((entry.name, entry.server_id))
         return servers
 
+    # - registry - #
+
+    def _relative_server_path(self, path: Path) -> str:
+        return path.relative_to(self._servers_path).as_posix()
+
+    def _read_server_metadata(self, path: Path) -> tuple[str | None, str]:
+        """
+        Reads the type (kherimoya.yaml) and state (state/state.json, or "creating" if it was never finished being
+        created) of a server directory.
+        """
+        server_type = None
+        state = "stopped"
+
+        try:
+            with open(path / "kherimoya.yaml", "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            server_type = data.get("type")
+        except (OSError, yaml.YAMLError, AttributeError):
+            pass
+
+        try:
+            with open(path / "state" / "state.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+            state = "running" if data.get("running") else "stopped"
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        if is_incomplete(path):
+            state = "creating"  # see create_server(resume=True)
+
+        return server_type, state
+
+    def _scan_servers(self) -> list[RegistryEntry]:
+        """
+        Walks the servers/ directory. Only used to (re)build the registry, everything else should read from the registry.
+        """
+        entries = []
+        for path, p in layout.iter_server_dirs(self._servers_path):
+            self.logger.debug(f"Found server directory in servers/: {path}")
+            name, server_id = p.name.split(DELIMITER, 1)
+            if self._id_reservations.held(server_id):
+                continue  # still being set up, whoever creates it registers it
+            server_type, state = self._read_server_metadata(Path(p.path))
+            entries.append(RegistryEntry(name, server_id, path, server_type, state))
+            self.logger.debug(f"Found server: {name}{DELIMITER}{server_id}")
+        return entries
+
+    def rebuild_registry(self) -> None:
+        """
+        Rebuilds the server registry from the servers/ directory.
+
+        Only needed if servers were added, removed or renamed without going through ServerManager.
+        """
+        entries = self._scan_servers()
+        self._registry.rebuild(entries)
+        self._registry_built = True
+        self._index.invalidate()
+        self._ids.rebuild([e.server_id for e in entries])
+        self.logger.info(f"Rebuilt server registry with {len(entries)} servers")
+
+    def _ensure_registry(self) -> None:
+        if self._registry_built:
+            return
+        if not self._registry.is_built():
+            self.rebuild_registry()
+        self._registry_built = True
+
+    def _ensure_ids(self) -> None:
+        if not self._ids.loaded:
+            self._ensure_registry()
+            server_ids = [e.server_id for e in self._registry.entries()]
+            if not self._ids.load(server_ids):  # reconciled with the registry, in case it drifted
+                self._ids.rebuild(server_ids)
+
+    def _registry_entries(self) -> list[RegistryEntry]:
+        self._ensure_registry()
+        return self._registry.entries()
+
+    def _ensure_index(self) -> None:
+        if not self._index.loaded:
+            self._index.load(self._registry_entries(), self._server_from_entry)
+
+    def _register(
+        self,
+        server: KherimoyaServer,
+        old_path: str | None = None,
+        server_type: str | None = None,
+        state: str | None = None,
+    ) -> None:
+        """
+        Adds or updates a server in the registry. The type and state are kept from the existing entry if not given.
+        """
+        if server.server_id is None:
+            return
+        path = self._relative_server_path(server.path)
+
+        existing = self._registry.get_by_path(old_path or path)
+        if existing is not None:
+            server_type = server_type if server_type is not None else existing.type
+            state = state if state is not None else existing.state
+
+        self._registry.upsert(
+            RegistryEntry(
+                server.name, server.server_id, path, server_type, state or "stopped"
+            ),
+            old_path=old_path,
+        )
+        self._index.add(path, server, old_path=old_path)
+        self._ensure_ids()
+        self._ids.mark(server.server_id)
+        self._id_reservations.release(server.server_id)  # it's in the registry now
+
+    def _unregister(self, path: str) -> None:
+        self._registry.remove(path)
+        self._index.remove(path)
+
+        server_id = path.rsplit("/", 1)[-1].split(DELIMITER, 1)[-1]
+        if self._registry.get_by_id(server_id) is None:
+            self._ensure_ids()
+            self._ids.release(server_id)
+
+    def _apply_event(self, event: ServerEvent) -> None:
+        """
+        Applies a change to servers/ (from a ServerWatcher) to the registry and identity map. Events caused by this
+        ServerManager itself are already applied, so this is idempotent.
+        """
+        self._ensure_registry()
+
+        if isinstance(event, ServerDeletedEvent):
+            self._unregister(event.path)
+            return
+
+        if isinstance(event, ServerRenamedEvent):
+            server = self._index.get_by_path(event.old_path)
+            if server is not None or self._registry.get_by_path(event.old_path):
+                if server is None:
+                    server = self._server_from_entry(
+                        RegistryEntry(event.name, event.server_id, event.path)
+                    )
+                server._moved_to(self._servers_path / event.path)
+                self._register(server, old_path=event.old_path)
+                return
+            # the old directory was unknown, so this is the same as a new server
+
+        if self._registry.get_by_path(event.path) is not None:
+            return  # already known, e.g. created by this ServerManager
+        if self._id_reservations.held(event.server_id):
+            # appeared because a creation (of this or another process) is setting it up, which registers it once its
+            # files are there
+            return
+
+        server_type, state = self._read_server_metadata(self._servers_path / event.path)
+        entry = RegistryEntry(event.name, event.server_id, event.path, server_type, state)
+        self._register(
+            self._server_from_entry(entry), server_type=server_type, state=state
+        )
+
+    def watch(
+        self, callback: Callable[[ServerEvent], None] | None = None
+    ) -> ServerWatcher:
+        """
+        Starts watching servers/ for servers that are added, renamed or removed without going through this ServerManager
+        (by hand, rsync, another process, ...), keeping the registry and cached servers up to date. Linux only.
+
+        Args:
+            callback (Callable[[ServerEvent], None] | None = None): Called (from the watcher thread) after each change was applied.
+
+        Returns:
+            ServerWatcher: The running watcher, call ServerWatcher.stop to stop it.
+
+        Example:
+            ```python
+            watcher = server_manager.watch(lambda event: print(event))
+            ...
+            watcher.stop()
+            ```
+        """
+
+        def on_event(event: ServerEvent) -> None:
+            self._apply_event(event)
+            if callback is not None:
+                callback(event)
+
+        watcher = ServerWatcher(
+            self._servers_path,
+            on_event,
+            on_overflow=self.rebuild_registry,
+            logger=self.logger,
+        )
+        watcher.start()
+        return watcher
+
+    def _name_taken(self, name: str) -> bool:
+        """
+        Whether or not a server already has this name. A set lookup, not a scan.
+        """
+        self._ensure_index()
+        return self._index.has_name(name)
+
+    @contextmanager
+    def _reserved_name(
+        self, name: str, error: type[Exception] = exceptions.ServerCreationError
+    ) -> Iterator[None]:
+        """
+        Holds a reservation on a server name while creating or renaming a server, if strict_names is enabled.
+        This is what keeps concurrent creators (threads or processes) from both taking the same name.
+        """
+        if not self.strict_names:
+            yield
+            return
+
+        if not self._registry.reserve_name(name):
+            raise error(
+                f"Server with name '{name}' already exists (or is being created), and strict_names is enabled."
+            )
+        try:
+            yield
+        finally:
+            self._registry.release_name(name)
+
+    def _server_path(self, name: str, server_id: str) -> Path:
+        """
+        Where a server with the given name and ID goes, in the current layout.
+        """
+        return self._servers_path / layout.relative_server_path(
+            name, server_id, self.layout
+        )
+
+    def migrate_layout(self, new_layout: Layout) -> int:
+        """
+        Converts servers/ to the given layout in place, by moving every server directory. Servers should be stopped first.
+
+        Args:
+            new_layout (Literal["flat", "sharded"]): The layout to convert to.
+
+        Returns:
+            int: The number of servers which were moved.
+
+        Example:
+            ```python
+            server_manager.migrate_layout("sharded")
+            ```
+        """
+        if new_layout not in layout.LAYOUTS:
+            raise exceptions.InvalidParameterError(f"Invalid layout: {new_layout}")
+
+        self.rebuild_registry()  # make sure every server on disk is moved
+        self._ensure_index()
+
+        running = [
+            e.path
+            for e in self._registry.entries()
+            if _server_running(self._index.get_by_path(e.path) or self._server_from_entry(e))
+        ]
+        if running:
+            raise exceptions.InvalidParameterError(
+                f"Stop all servers before migrating the layout, these are running: {', '.join(running)}"
+            )
+
+        moved = 0
+        for entry in self._registry.entries():
+            new_path = layout.relative_server_path(
+                entry.name, entry.server_id, new_layout
+            )
+            if new_path == entry.path:
+                continue
+
+            target = self._servers_path / new_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            (self._servers_path / entry.path).rename(target)
+
+            server = self._index.get_by_path(entry.path) or self._server_from_entry(
+                entry
+            )
+            server._moved_to(target)
+            self._register(server, old_path=entry.path)
+            moved += 1
+
+        layout.write_layout(self._servers_path, new_layout)
+        layout.prune_empty_shards(self._servers_path)
+        self.logger.info(f"Migrated {moved} servers to the {new_layout} layout")
+        return moved
+
+    def _server_from_entry(self, entry: RegistryEntry) -> KherimoyaServer:
+        """
+        Builds a server from a registry entry. This is a pure read, nothing is written (or even stat'd).
+        """
+        return KherimoyaServer._from_metadata(
+            project_path=self.project_path,
+            name=entry.name,
+            server_id=entry.server_id,
+            path=self._servers_path / entry.path,
+            server_type=cast(Literal["python", "docker"] | None, entry.type),
+            running=entry.state == "running",
+        )
+
     def list_server_ids(self) -> list[str | None]:
         """
         Lists all of the server IDs in the servers/ directory.
@@ -429,24 +1137,69 @@ class ServerManager:
         """
         Lists all of the servers in the servers/ directory as KherimoyaServer objects.
 
+        The objects are shared with get_server_by_id, so the same server is always the same object.
+
         Returns:
             list[KherimoyaServer]: A list of KherimoyaServer objects for each server found.
         """
-        server_objects = []
-        all_servers = cast(list[tuple[str, str | None]], self._list_servers())
+        self._ensure_index()
+        return self._index.values()
 
-        for server in all_servers:
-            try:
-                kherimoya_server = KherimoyaServer(
-                    project_path=self.project_path, name=server[0]
-                )
-                kherimoya_server.refresh(
-                    self.project_path / "servers" / f"{server[0]}{DELIMITER}{server[1]}"
-                )
-                server_objects.append(kherimoya_server)
-            except Exception:
+    def iter_servers(
+        self,
+        cursor: str | None = None,
+        limit: int | None = None,
+        name_prefix: str | None = None,
+        server_type: Literal["python", "docker"] | None = None,
+        running: bool | None = None,
+    ) -> Iterator[KherimoyaServer]:
+        """
+        Lazily iterates over servers ordered by ID, optionally paginated and filtered.
+
+        Only a small batch of servers is held in memory at a time, so this is what large listings (e.g. a paginated
+        web listing) should use instead of list_server_objects.
+
+        Args:
+            cursor (str | None = None): Start after the server with this ID, i.e. the ID of the last server of the previous page.
+            limit (int | None = None): Maximum number of servers to yield. If None, yield all of them.
+            name_prefix (str | None = None): Only yield servers whose name starts with this.
+            server_type (Literal["python", "docker"] | None = None): Only yield servers of this type.
+            running (bool | None = None): Only yield running (True) or stopped (False) servers, going by their tmux
+                session / supervised process.
+
+        Yields:
+            KherimoyaServer: The servers, the same objects returned by get_server_by_id.
+
+        Example:
+            ```python
+            page = list(server_manager.iter_servers(limit=50))
+            next_page = list(server_manager.iter_servers(cursor=page[-1].server_id, limit=50))
+            ```
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        self._ensure_registry()
+        entries = self._registry.iter_entries(
+            after=cursor,
+            name_prefix=name_prefix,
+            server_type=server_type,
+            batch_size=min(limit, 256) if limit is not None else 256,
+        )
+
+        count = 0
+        for entry in entries:
+            if running is not None and entry.state == "creating":
                 continue
-        return server_objects
+            server = self._index.get_by_path(entry.path)
+            if server is None:
+                server = self._server_from_entry(entry)
+            if running is not None and _server_running(server) != running:
+                continue
+            yield server
+            count += 1
+            if limit is not None and count >= limit:
+                return
 
     def get_server_by_id(self, server_id: str) -> KherimoyaServer | None:
         """
@@ -457,24 +1210,119 @@ class ServerManager:
 
         Returns:
             KherimoyaServer | None: The KherimoyaServer with the given ID, or None if not found.
+                Repeated calls return the same object.
         """
-        all_servers = self.list_server_objects()
-        for server in all_servers:
-            if server.server_id and server.server_id.lower() == server_id.lower():
-                self.logger.info(
-                    f"Found server: {server.name}{DELIMITER}{server.server_id}"
-                )
-                return server
+        self._ensure_index()
+        server = self._index.get(server_id)
+        if server is not None:
+            self.logger.info(
+                f"Found server: {server.name}{DELIMITER}{server.server_id}"
+            )
+            return server
         self.logger.info(f"Failed to find a server with ID: {server_id}")
         return None
 
-    def _generate_unique_id(self, max_random_tries: int = 1000) -> str:
+    def find_servers(
+        self,
+        prefix: str | None = None,
+        fuzzy: str | None = None,
+        match_ids: bool = True,
+        match_names: bool = True,
+        limit: int | None = None,
+    ) -> list[KherimoyaServer]:
         """
-        Generate a short human-readable, hyphen-separated unique ID
+        Finds servers by partial ID and/or name (case-insensitive).
 
-        The ID is groups of 4 characters separated by hyphens e.g.:
-        - "abcd" (1 group)
-        - "abcd-ef12" (2 groups)
+        Args:
+            prefix (str | None = None): Find servers whose ID or name starts with this, e.g. "ab3".
+            fuzzy (str | None = None): Find servers whose ID or name is close to this (typos).
+            match_ids (bool = True): Whether or not to match server IDs.
+            match_names (bool = True): Whether or not to match server names.
+            limit (int | None = None): Maximum number of servers to return.
+
+        Returns:
+            list[KherimoyaServer]: Matching servers; exact matches first, then prefix matches, then fuzzy matches.
+
+        Example:
+            ```python
+            server_manager.find_servers(prefix="ab3") # [<KherimoyaServer 'lobby'@'ab3x' ...>]
+            server_manager.find_servers(fuzzy="lobyy") # [<KherimoyaServer 'lobby'@'ab3x' ...>]
+            ```
+        """
+        self._ensure_index()
+        return self._index.find(
+            prefix=prefix, fuzzy=fuzzy, ids=match_ids, names=match_names, limit=limit
+        )
+
+    def resolve_server(self, query: str, match_names: bool = True) -> KherimoyaServer:
+        """
+        Resolves a full or partial server ID (or name) to exactly one server.
+
+        An exact ID always wins, then a unique ID prefix, then (if match_names) an exact name, then a unique name prefix.
+
+        Args:
+            query (str): The full or partial ID/name.
+            match_names (bool = True): Whether or not to also try names.
+
+        Returns:
+            KherimoyaServer: The matching server.
+
+        Raises:
+            ServerDoesNotExistError: If nothing matches.
+            AmbiguousServerError: If the query matches more than one server.
+        """
+        self._ensure_index()
+        server = self._index.get(query)  # not get_server_by_id, which logs every miss
+        if server is not None:
+            return server
+
+        candidates = self.find_servers(prefix=query, match_names=False)
+        if not candidates and match_names:
+            candidates = self.find_servers(prefix=query, match_ids=False)
+            exact = [s for s in candidates if s.name.casefold() == query.casefold()]
+            if len(exact) == 1:
+                return exact[0]
+
+        if len(candidates) == 1:
+            return candidates[0]
+        if not candidates:
+            suggestions = self.find_servers(
+                fuzzy=query, match_names=match_names, limit=5
+            )
+            hint = (
+                f" Did you mean: {', '.join(f'{s.name}{DELIMITER}{s.server_id}' for s in suggestions)}?"
+                if suggestions
+                else ""
+            )
+            raise exceptions.ServerDoesNotExistError(
+                f"No server matches '{query}'.{hint}"
+            )
+        raise exceptions.AmbiguousServerError(
+            f"'{query}' matches {len(candidates)} servers: "
+            + ", ".join(f"{s.name}{DELIMITER}{s.server_id}" for s in candidates[:10])
+        )
+
+    def _id_taken(self, server_id: str) -> bool:
+        """
+        Tries to reserve an ID for this process; True if that failed or a server already uses it.
+
+        The reservation has to come before the registry check: whoever created a server releases the
+        ID only after registering it, so a concurrent creator either can't reserve the ID or sees it registered.
+        """
+        if not self._id_reservations.reserve(server_id):
+            return True
+        if self._registry.get_by_id(server_id) is not None:
+            self._id_reservations.release(server_id)
+            return True
+        return False
+
+    def _generate_unique_id(self, max_random_tries: int = 1000) -> str:
+        """
+        Generate a short human-readable, hyphen-separated unique ID
+
+        The ID is groups of 4 characters separated by hyphens e.g.:
+        - "abcd" (1 group)
+        - "abcd-ef12" (2 groups)
         - "abcd-ef12-3456" (3 groups)
         and so on.
 
@@ -485,59 +1333,29 @@ class ServerManager:
 
         Case is normalized to lowercase, comparisons with existing IDs are
         case-insensitive.
-        """
-        ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
-        GROUP_SIZE = 4
-        MAX_RANDOM_TRIES = max_random_tries
-
-<<<<<<< HEAD
-        existing = [str(x).lower() for x in self.list_server_ids() if isinstance(x, str) and x is not None]
-=======
-        # collect existing IDs, lowercased and filter None entries
-        existing = [
-            str(x).lower()
-            for x in self.list_server_ids()
-            if isinstance(x, str) and x is not None
-        ]
->>>>>>> 171c503 (move delimiter import to top of servers.py)
-        existing_set = set(existing)
-
-        def _random_id(groups: int) -> str:
-            return "-".join(
-                "".join(secrets.choice(ALPHABET) for _ in range(GROUP_SIZE))
-                for _ in range(groups)
-            )
-
-        # try group counts starting at 1 and increasing if the space is exhausted
-        for groups in range(
-            1, 10
-        ):  # sane upper bound; will fall back to uuid4 if needed
-            self.logger.debug(f"Trying to generate unique ID with {groups} groups")
-            # pattern to detect existing IDs at this groups length (lowercase)
-            # e.g. for groups=1 -> ^[0-9a-z]{4}$ ; groups=2 -> ^[0-9a-z]{4}(?:-[0-9a-z]{4}){1}$
-            if groups == 1:
-                pattern = re.compile(rf"^[0-9a-z]{{{GROUP_SIZE}}}$")
-            else:
-                pattern = re.compile(
-                    rf"^[0-9a-z]{{{GROUP_SIZE}}}(?:-[0-9a-z]{{{GROUP_SIZE}}}){{{groups - 1}}}$"
-                )
 
-            existing_of_length = sum(1 for e in existing_set if pattern.match(e))
-            space_size = len(ALPHABET) ** (GROUP_SIZE * groups)
+        Free 1-group IDs come from an occupancy bitmap (see core.ids.IdAllocator) rather than
+        rescanning every existing ID. The generated ID is marked as used once its server is registered.
 
-            if existing_of_length >= space_size:
-                continue # try next groups count
+        The ID is also reserved (see core.ids.IdReservations) until the server using it is registered,
+        so concurrent creators in other processes can't be handed the same ID.
+        """
+        self._ensure_registry()
+        self._ensure_ids()
 
-            for _ in range(MAX_RANDOM_TRIES):
-                candidate = _random_id(groups)
-                if candidate not in existing_set:
-                    self.logger.info(f"Generated unique ID: {candidate}")
-                    return candidate
+        candidate = self._ids.allocate(
+            self._id_taken,
+            registered=lambda server_id: self._registry.get_by_id(server_id) is not None,
+            max_random_tries=max_random_tries,
+        )
+        if candidate is not None:
+            self.logger.info(f"Generated unique ID: {candidate}")
+            return candidate
 
         # as a last fallback (VERY unlikely), generate a uuid4 to be safe.
         while True:
             candidate = str(uuid.uuid4())
-            if candidate.lower() not in existing_set:
+            if not self._id_taken(candidate):
                 self.logger.info(f"Generated fallback UUID: {candidate}")
                 return candidate
 
@@ -550,191 +1368,465 @@ class ServerManager:
         """
 
         conflicts_found = False
-        seen_ids = set()
+        self._ensure_registry()
+
+        for server_id in self._registry.duplicate_ids():
+            # the first server keeps its ID, every other one gets a new one
+            for entry in self._registry.entries_by_id(server_id)[1:]:
+                server = self._server_from_entry(entry)
+                if not server.path.is_dir():
+                    self._unregister(entry.path)
+                    continue
 
-        for server in self.list_server_objects():
-            # check if the ID is already seen
-            if (server.server_id or "").lower() in seen_ids:
                 # generate a new unique ID for this server, renaming the folder accordingly
                 server._server_id = self._generate_unique_id()
-                new_path = (
-                    server.path.parent / f"{server.name}{DELIMITER}{server.server_id}"
-                ).resolve()
+                new_path = self._server_path(server.name, server.server_id)
+                new_path.parent.mkdir(parents=True, exist_ok=True)
                 server.path.rename(new_path)
                 server.refresh(new_path)  # refresh sets the name and id
+                self._register(server, old_path=entry.path)
                 conflicts_found = True
-            else:
-                if server.server_id is not None:
-                    seen_ids.add(server.server_id.lower())
 
         return conflicts_found
 
     # - server actions - #
 
+    def _spawn_setup_session(
+        self, server: KherimoyaServer, base_path: Path, console: ConsoleLog
+    ) -> TmuxControl:
+        """
+        Starts endstone for setting up a server in a new tmux session, with its console streamed to the console log.
+        """
+        session_name = f"{server.name}{DELIMITER}{server.server_id}"
+        self.logger.info(
+            f"Starting Endstone to set up server in tmux session: {session_name}"
+        )
+
+        tmux = get_control()
+
+        # kill any existing session with the same name
+        tmux.kill_session(session_name)
+
+        script_path = Path(
+            PROJECT_PATH / "core" / "_scripts" / "start_endstone.sh"
+        ).resolve()
+
+        window_command = f'bash --norc --noprofile -lc "chmod +x {script_path} && exec {script_path} {sys.executable} {base_path}"'
+
+        self.logger.info(f"Using window command: `{window_command}`")
+
+        tmux.new_session(
+            session_name,
+            window_command,
+            start_directory=str(base_path / "server"),
+        )
+        # stream the console to state/console.log, which is what the creation waits watch
+        tmux.pipe_pane(session_name, f"cat >> {shlex.quote(str(console.path))}")
+        return tmux
+
+    @staticmethod
+    def _kill_session(session_name: str) -> None:
+        try:
+            get_control().kill_session(session_name)
+        except Exception:
+            pass
+
     def _create_server_with_python(
-        self, server: KherimoyaServer, install_timeout: float | None = 300
+        self,
+        server: KherimoyaServer,
+        install_timeout: float | None = 300,
+        resume: bool = False,
     ) -> KherimoyaServer:
         """
         Creates a new server using the Python method (endstone).
 
+        Progress is checkpointed in state/creation.json after every stage (see checkpoints.STAGES). If creation fails
+        or times out, the directory is kept, and calling this again with resume=True continues from the last completed
+        stage instead of starting over.
+
         Args:
-            server (KherimoyaServer): The KherimoyaServer to create.
+            server (KherimoyaServer): The KherimoyaServer to create, or with resume, the partially created one.
+            resume (bool = False): Whether or not server is a partially created server to finish.
         """
         new_server = server
-        # - set up the server - #
-        new_server._server_id = str(self._generate_unique_id())
-        self.logger.info(f"Generated server ID: {new_server.server_id}")
+        timer = StageTimer()
+        version = endstone_version()
 
-        base_path = (
-            self.project_path
-            / "servers"
-            / f"{new_server.name}{DELIMITER}{new_server.server_id}"
-        ).resolve()
-        self.logger.debug(f"Creating server directory at: {base_path}")
-        base_path.mkdir(parents=False, exist_ok=False)
+        if resume:
+            base_path = new_server.path
+            checkpoint = CreationCheckpoint(base_path)
+            if checkpoint.owner_alive():
+                raise exceptions.ServerCreationError(
+                    f"Server {base_path.name} is being created by another process (pid {checkpoint.get('pid')})."
+                )
+            if checkpoint.get("endstone_version") != version:
+                # whatever was installed is for another version, only the directories are still good
+                checkpoint.reset(*checkpoint.completed[1:])
+            self.logger.info(
+                f"Resuming creation of {base_path.name} after stage: {checkpoint.last}"
+            )
 
-        # - make the filestructure - #
-        for subdir in ["config", "extra", "server", "state"]:
-            self.logger.debug(f"Creating subdirectory: {subdir}")
-            (base_path / subdir).resolve().mkdir()
+        bds_needed = not (
+            resume and (checkpoint.done("bds_ready") or checkpoint.done("installed"))
+        )
+        if bds_needed and self._offline and not self._can_install_offline(version):
+            raise exceptions.ServerCreationError(
+                f"Offline, and neither the install cache nor the artifact mirror has BDS for Endstone {version}."
+            )
 
-        new_server.refresh(base_path)  # sets all attributes and writes to server.json
+        if not resume:
+            # - set up the server - #
+            timer.start("allocate_id")
+            new_server._server_id = str(self._generate_unique_id())
+            self.logger.info(f"Generated server ID: {new_server.server_id}")
 
-        # - set up with Endstone - #
-        session_name = f"{new_server.name}{DELIMITER}{new_server.server_id}"
-        tmux_server = None
-        session = None
+            timer.start("mkdir")
+            base_path = self._server_path(new_server.name, new_server.server_id)
+            self.logger.debug(f"Creating server directory at: {base_path}")
+            base_path.parent.mkdir(parents=True, exist_ok=True)  # shard directories
+            base_path.mkdir(parents=False, exist_ok=False)
 
-        self.logger.info(
-            f"Starting Endstone to set up server in tmux session: {session_name}"
-        )
+            # - make the filestructure - #
+            for subdir in ["config", "extra", "server", "state"]:
+                self.logger.debug(f"Creating subdirectory: {subdir}")
+                (base_path / subdir).resolve().mkdir()
 
-        try:  # start session
-            tmux_server = libtmux.Server()
-            tmux_server.cmd("set-option", "-g", "default-shell", "/bin/bash")
+            new_server.refresh(base_path)  # sets all attributes and writes to server.json
 
-            # kill any existing session with the same name
-            try:
-                existing = tmux_server.find_where({"session_name": session_name})
-                if existing:
-                    existing.kill_session()
-            except Exception:
-                pass
-
-            script_path = Path(
-                PROJECT_PATH / "core" / "_scripts" / "start_endstone.sh"
-            ).resolve()
+            checkpoint = CreationCheckpoint(base_path)
+            checkpoint.complete("dirs_created")
+            # registered right away, so the name and ID stay taken while the creation is unfinished
+            self._register(new_server, server_type="python", state="creating")
 
-            window_command = f'bash --norc --noprofile -lc "chmod +x {script_path} && {script_path} {sys.executable} {base_path}; exit"'
+        checkpoint.begin_attempt(endstone_version=version)
+        session_name = f"{new_server.name}{DELIMITER}{new_server.server_id}"
+        resume_hint = f"Resume with create_server({new_server.name!r}, resume=True)."
+        worlds_path = base_path / "server" / "worlds"
+        binary_path = base_path / "server" / BDS_BINARY
+
+        # - populate from the install cache (or the artifact mirror), so endstone finds BDS installed and skips downloading it - #
+        if bds_needed:
+            if resume:
+                # left over from an install which was interrupted, and might be incomplete
+                shutil.rmtree(base_path / "server", ignore_errors=True)
+                (base_path / "server").mkdir()
+
+            timer.start("cache_populate")
+            source = "download"
+            if self._install_cache and version and self._install_cache.populate(
+                version, base_path / "server"
+            ):
+                source = "cache"
+            elif version and self._artifacts.has(version):
+                timer.start("artifact_extract")
+                try:
+                    self._artifacts.extract_bds(
+                        version, base_path / "server", bds_version=minecraft_version()
+                    )
+                    binary_path.chmod(binary_path.stat().st_mode | 0o111)
+                except (OSError, exceptions.ArtifactError) as e:
+                    raise exceptions.ServerCreationError(
+                        f"Failed to install BDS from the artifact mirror for server {base_path.name}. {resume_hint}"
+                    ) from e
+                source = "artifacts"
+
+            if source != "download":
+                checkpoint.complete("bds_ready", bds_source=source)
+            else:
+                checkpoint.update(bds_source=source)
 
-            self.logger.info(f"Using window command: `{window_command}`")
+        # - set up with Endstone - #
+        tmux = None
+        console = ConsoleLog(console_log_path(base_path))
 
-            session = tmux_server.new_session(
-                session_name=session_name,
-                start_directory=str(base_path / "server"),
-                window_command=window_command,
-            )
+        if not checkpoint.done("world_generated"):
+            timer.start("tmux_spawn")
+            console.create()
+            try:  # start session
+                tmux = self._spawn_setup_session(new_server, base_path, console)
+            except Exception as e:
+                self.logger.error(f"Failed to create tmux session for server {session_name}.")
+                self._kill_session(session_name)
+                raise exceptions.ServerCreationError(
+                    f"Failed to create tmux session for server {session_name}. {resume_hint}"
+                ) from e
 
-            window = session.windows[0]
-            pane = window.panes[0]
-        except Exception as e:
-            # delete base_path
-            self.logger.error(
-                f"Failed to create tmux session for server {session_name}, cleaning up created files."
+        if not checkpoint.done("installed"):
+            # when endstone is ran in an environment which does not have a endstone BDS installed, it will create the server and start it
+            # woken up by inotify as soon as worlds/ appears or endstone writes to the console, the session check is only a fallback
+            install_deadline = (
+                None if install_timeout is None else time.monotonic() + install_timeout
             )
-            try:
-                if base_path.exists() and base_path.is_dir():
-                    for sub in base_path.iterdir():
-                        if sub.is_dir():
-                            for subsub in sub.iterdir():
-                                subsub.unlink()
-                            sub.rmdir()
-                    base_path.rmdir()
-            except Exception:
-                pass
-            raise exceptions.ServerCreationError(
-                f"Failed to create tmux session for server {session_name}"
-            ) from e
-
-        # when endstone is ran in an environment which does not have a endstone BDS installed, it will create the server and start it
-        start_time = time.monotonic()
-        sleep_interval = 0.5
-        while not Path(
-            base_path / "server" / "worlds"
-        ).is_dir():  # wait until server is installed
-            if (
-                install_timeout is not None
-                and (time.monotonic() - start_time) > install_timeout
-            ):
-                # best-effort cleanup: kill tmux session, then raise
-                try:
-                    if tmux_server:
-                        s = tmux_server.find_where({"session_name": session_name})
-                        if s:
-                            s.kill_session()
-                except Exception:
-                    pass
-                # delete base_path
+
+            def wait_for_install(condition: Callable[[], bool]) -> bool:
+                return wait_until(
+                    lambda: condition() or console.finished,
+                    watches=[
+                        (base_path / "server", _inotify.IN_CREATE | _inotify.IN_MOVED_TO),
+                        (console.path, _inotify.IN_MODIFY),
+                    ],
+                    timeout=(
+                        None
+                        if install_deadline is None
+                        else max(0.0, install_deadline - time.monotonic())
+                    ),
+                    slow_condition=lambda: not tmux.has_session(session_name),
+                )
+
+            timer.start("download")  # nearly nothing when populated from the install cache
+            installed = wait_for_install(lambda: binary_path.exists() or worlds_path.is_dir())
+            if installed:
+                timer.start("server_start")
+                installed = wait_for_install(worlds_path.is_dir)
+
+            if not installed:
+                # kill the session, but keep everything done so far for a resume
+                self._kill_session(session_name)
                 self.logger.error(
-                    f"Server installation/start timed out for server {session_name}, cleaning up created files."
+                    f"Server installation/start timed out for server {session_name}, keeping it for a resume."
                 )
-                try:
-                    if base_path.exists() and base_path.is_dir():
-                        for sub in base_path.iterdir():
-                            if sub.is_dir():
-                                for subsub in sub.iterdir():
-                                    subsub.unlink()
-                                sub.rmdir()
-                        base_path.rmdir()
-                except Exception:
-                    pass
                 raise TimeoutError(
-                    f"Server installation/start did not complete within {install_timeout} seconds."
+                    f"Server installation/start did not complete within {install_timeout} seconds. {resume_hint}"
                 )
 
-            output = "\n".join(pane.capture_pane()[-20:])  # last 20 lines only
-            if "__ENDSTONE_DONE__" in output or session not in tmux_server.sessions:
+            if not worlds_path.is_dir():
                 raise exceptions.ServerCreationError(
-                    f"Endstone process exited unexpectedly during server creation for server {session_name}; output:\n{output}"
+                    f"Endstone process exited unexpectedly during server creation for server {session_name}; "
+                    f"output:\n{console.tail()}\n{resume_hint}"
                 )
+            checkpoint.complete("installed")
+
+        if not checkpoint.done("world_generated"):
+            # worlds/ appears early during startup, stop commands are only handled once the server is up
+            timer.start("world_generation")
+            wait_until(
+                lambda: console.seen(READY_MARKER) or console.finished,
+                watches=[(console.path, _inotify.IN_MODIFY)],
+                timeout=_READY_GRACE,
+            )
+            checkpoint.complete("world_generated")
 
-            time.sleep(sleep_interval)
-            sleep_interval = min(2.0, sleep_interval * 1.5)
-
-        time.sleep(1)
-
-        # send stop command, which should gracefully stop the server
-        pane.send_keys("stop", enter=True)
-        stop_start = time.monotonic()
-        self.logger.info(
-            f"Sent stop command to server {session_name}, waiting for tmux session to close."
-        )
+        if not checkpoint.done("stopped"):
+            timer.start("stop_wait")
+            if tmux is not None:
+                # send stop command, which should gracefully stop the server
+                tmux.send_keys(session_name, "stop")
+                self.logger.info(
+                    f"Sent stop command to server {session_name}, waiting for tmux session to close."
+                )
 
-        while True:
-            if not tmux_server.has_session(session_name):  # session gone
-                break
-            if time.monotonic() - stop_start > 60:  # good enough timeout
-                break
-            time.sleep(0.5)
+                wait_until(
+                    lambda: console.finished,
+                    watches=[(console.path, _inotify.IN_MODIFY)],
+                    timeout=60,  # good enough timeout
+                    slow_condition=lambda: not tmux.has_session(session_name),
+                )
+            else:
+                # resumed after the world was generated, endstone is not supposed to be running anymore
+                self._kill_session(session_name)
+            checkpoint.complete("stopped")
 
         # - finishing up - #
+        timer.start("cache_store")
+        # also after extracting from the artifact mirror, so later creations link from the cache instead of hashing
+        # and extracting the zip again
+        if (
+            self._install_cache
+            and version
+            and checkpoint.get("bds_source") in ("download", "artifacts")
+            and not self._install_cache.has(version)
+        ):
+            try:
+                self._install_cache.store(version, base_path / "server")
+            except OSError as e:
+                self.logger.warning(f"Failed to store the install in the install cache: {e}")
+
+        timer.start("finalize")
         with open(base_path / "state" / "state.json", "w", encoding="utf-8") as f:
             json.dump({"running": False}, f, indent=4)
 
         with open(base_path / "kherimoya.yaml", "w") as f:
             yaml.dump({"type": "python"}, f)
 
+        checkpoint.finish()
+        self._register(new_server, server_type="python", state="stopped")
+        timer.start("dedup")
+        self._dedup_new_server(base_path)
+        timer.stop()
+
         self.logger.info(
             f"Successfully created server: {new_server.name}{DELIMITER}{new_server.server_id}"
         )
+        self._report_creation_timings(new_server, timer, "python")
+
+        return new_server
+
+    def _can_install_offline(self, version: str | None) -> bool:
+        if version is None:
+            return False
+        if self._install_cache and self._install_cache.has(version):
+            return True
+        return self._artifacts.has(version)
+
+    def _emit_metric(self, event: str, record: dict) -> None:
+        if self._metrics_sink is None:
+            return
+        try:
+            self._metrics_sink(event, record)
+        except Exception:
+            self.logger.exception(f"Metrics sink failed for {event}")
+
+    def _report_creation_timings(
+        self, server: KherimoyaServer, timer: StageTimer, method: str
+    ) -> None:
+        """
+        Stores the stage timings of a creation on the server, logs them as one structured record and exports them.
+        """
+        record = {
+            "event": "server_created",
+            "name": server.name,
+            "server_id": server.server_id,
+            "method": method,
+            "total": round(timer.total, 6),
+            "stages": {stage: round(seconds, 6) for stage, seconds in timer.stages.items()},
+        }
+        server._creation_timings = record
+        # the record is in the message for plain log handlers, and in `extra` for structured ones
+        self.logger.info(
+            f"Creation timings: {json.dumps(record)}", extra={"kherimoya": record}
+        )
+        self._emit_metric("server_created", record)
+
+    def _dedup_new_server(self, base_path: Path) -> None:
+        if not self._dedup_on_create:
+            return
+        try:
+            report = self._blobs.dedup_tree(base_path / "server")
+        except OSError as e:
+            self.logger.warning(f"Failed to deduplicate {base_path.name}: {e}")
+            return
+        if report.files_linked or report.blobs_added:
+            self.logger.debug(
+                f"Deduplicated {base_path.name}: {report.files_linked} files linked, "
+                f"{report.bytes_saved / 1e6:.1f} MB saved"
+            )
+
+    def _create_server_from_template(
+        self, server: KherimoyaServer, template: str
+    ) -> KherimoyaServer:
+        """
+        Creates a new server by cloning a template, without booting it.
+        """
+        new_server = server
+        timer = StageTimer()
+        timer.start("allocate_id")
+        new_server._server_id = str(self._generate_unique_id())
+        self.logger.info(f"Generated server ID: {new_server.server_id}")
+
+        timer.start("mkdir")
+        base_path = self._server_path(new_server.name, new_server.server_id)
+        self.logger.debug(f"Cloning template '{template}' to: {base_path}")
+        base_path.parent.mkdir(parents=True, exist_ok=True)  # shard directories
+        base_path.mkdir(parents=False, exist_ok=False)
+
+        try:
+            timer.start("clone")
+            linked, copied = self._templates.clone_into(template, base_path)
+            for subdir in ["config", "extra", "server", "state"]:
+                (base_path / subdir).mkdir(exist_ok=True)
+
+            timer.start("finalize")
+            new_server.refresh(base_path)  # sets all attributes and writes to server.json
+
+            with open(base_path / "state" / "state.json", "w", encoding="utf-8") as f:
+                json.dump({"running": False}, f, indent=4)
 
+            with open(base_path / "kherimoya.yaml", "w") as f:
+                yaml.dump({"type": "python"}, f)
+        except BaseException as e:
+            self.logger.error(
+                f"Failed to clone template '{template}' for server {base_path.name}, cleaning up created files."
+            )
+            shutil.rmtree(base_path, ignore_errors=True)
+            if isinstance(e, OSError):
+                raise exceptions.ServerCreationError(
+                    f"Failed to clone template '{template}' for server {base_path.name}"
+                ) from e
+            raise
+
+        self._register(new_server, server_type="python", state="stopped")
+        timer.start("dedup")
+        self._dedup_new_server(base_path)
+        timer.stop()
+        self.logger.info(
+            f"Created server {base_path.name} from template '{template}' "
+            f"({linked / 1e6:.1f} MB linked, {copied / 1e6:.1f} MB copied)"
+        )
+        self._report_creation_timings(new_server, timer, "template")
         return new_server
 
+    def get_incomplete_server(self, name: str) -> KherimoyaServer | None:
+        """
+        Gets the server with the given name whose creation failed or timed out (see create_server's resume), if any.
+        """
+        for server in self.iter_servers(name_prefix=name):
+            if server.name == name and is_incomplete(server.path):
+                return server
+        return None
+
+    def save_template(
+        self,
+        server: KherimoyaServer,
+        name: str,
+        include_world: bool = True,
+        overwrite: bool = False,
+    ) -> Path:
+        """
+        Saves a stopped server as a golden template, which new servers can then be cloned from with
+        create_server(template=...).
+
+        Args:
+            server (KherimoyaServer): An existing, stopped server, set up the way new servers should be.
+            name (str): Name of the template.
+            include_world (bool = True): Whether or not new servers start with a copy of this server's world.
+            overwrite (bool = False): Whether or not to replace an existing template with the same name.
+
+        Returns:
+            Path: The template's directory.
+
+        Example:
+            ```python
+            server = server_manager.create_server("lobby-base")
+            # ... configure server.properties, add plugins, ...
+            server_manager.save_template(server, "lobby")
+            server_manager.create_server("lobby1", template="lobby")
+            ```
+        """
+        if not server.exists:
+            raise exceptions.ServerDoesNotExistError("Server does not exist")
+        if _server_running(server):
+            raise exceptions.InvalidParameterError(
+                "Server must be stopped before it is saved as a template"
+            )
+
+        try:
+            return self._templates.save(
+                name,
+                server.path,
+                include_world=include_world,
+                overwrite=overwrite,
+                endstone_version=endstone_version(),
+            )
+        except (ValueError, FileExistsError) as e:
+            raise exceptions.InvalidParameterError(str(e)) from e
+
     def create_server(
         self,
         server: str | KherimoyaServer,
         install_timeout: float | None = 300,
         method: Literal["python", "docker"] = "python",
+        template: str | None = None,
+        resume: bool = False,
     ) -> KherimoyaServer:
         """
         Creates a new server from a string for the name, or a nonexisting KherimoyaServer
@@ -743,6 +1835,11 @@ class ServerManager:
             server (str | KherimoyaServer): A name for the server, or a nonexisting KherimoyaServer
             install_timeout (float | None = 300): Maximum seconds to wait for endstone to finish initial install/start.
                 If None, wait indefinitely.
+            template (str | None = None): Name of a template (see save_template) to clone the server from, instead of
+                installing and booting it. Much faster, as the server is only copied (copy-on-write where possible).
+            resume (bool = False): If a creation of a server with this name failed or timed out earlier, continue it
+                from its last completed stage (e.g. without installing BDS again) instead of creating a new server.
+                Creates a new server as usual if there is none to resume.
 
         Returns:
             KherimoyaServer: The new, existing server.
@@ -755,8 +1852,52 @@ class ServerManager:
             # Create a server from a nonexisting KherimoyaServer
             server2 = KherimoyaServer(PROJECT_PATH, "newserver2")
             server2 = ServerManager.create_server(server2)
+
+            # Clone a server from a template
+            server3 = ServerManager.create_server("newserver3", template="lobby")
+
+            # Finish a creation which timed out
+            try:
+                server4 = ServerManager.create_server("newserver4", install_timeout=60)
+            except TimeoutError:
+                server4 = ServerManager.create_server("newserver4", resume=True)
             ```
         """
+        name = server.name if isinstance(server, KherimoyaServer) else server
+        if is_spare_name(name):
+            raise exceptions.ServerCreationError(
+                f"Server names starting with '{SPARE_PREFIX}' are reserved for spare servers."
+            )
+        return self._create_server(
+            server,
+            install_timeout=install_timeout,
+            method=method,
+            template=template,
+            resume=resume,
+        )
+
+    def _create_server(
+        self,
+        server: str | KherimoyaServer,
+        install_timeout: float | None = 300,
+        method: Literal["python", "docker"] = "python",
+        template: str | None = None,
+        resume: bool = False,
+    ) -> KherimoyaServer:
+        """
+        create_server, without refusing the names of spare servers (which only the warm pool creates).
+        """
+        if resume:
+            incomplete = self.get_incomplete_server(
+                server.name if isinstance(server, KherimoyaServer) else server
+            )
+            if incomplete is not None:
+                if method == "docker":
+                    raise NotImplementedError("Docker method is not yet implemented.")
+                return self._create_server_with_python(
+                    incomplete, install_timeout=install_timeout, resume=True
+                )
+
         if isinstance(server, KherimoyaServer):
             if server.exists:
                 raise FileExistsError("Server already exists")
@@ -768,7 +1909,7 @@ class ServerManager:
             raise exceptions.ServerCreationError(
                 f"Server '{new_server.name}' already exists."
             )
-        elif new_server.name in self.list_server_names() and self.strict_names:
+        elif self.strict_names and self._name_taken(new_server.name):
             raise exceptions.ServerCreationError(
                 f"Server with name '{new_server.name}' already exists, and strict_names is enabled."
             )
@@ -787,12 +1928,215 @@ class ServerManager:
                 f"Server name cannot contain '-', ':', '/', '{DELIMITER}', or '\\' characters."
             )
 
-        if method == "python":
-            return self._create_server_with_python(
-                new_server, install_timeout=install_timeout
-            )
-        elif method == "docker":
+        if method == "docker":
             raise NotImplementedError("Docker method is not yet implemented.")
+        if template is not None and not self._templates.has(template):
+            raise exceptions.ServerCreationError(f"Template '{template}' does not exist.")
+
+        with self._reserved_name(new_server.name, exceptions.ServerCreationError):
+            try:
+                if template is not None:
+                    return self._create_server_from_template(new_server, template)
+                return self._create_server_with_python(
+                    new_server, install_timeout=install_timeout
+                )
+            except BaseException:
+                # give the generated ID's reservation back, unless the server made it into the registry
+                if (
+                    new_server.server_id is not None
+                    and self._registry.get_by_id(new_server.server_id) is None
+                ):
+                    self._id_reservations.release(new_server.server_id)
+                raise
+
+    def create_servers(
+        self,
+        names: list[str],
+        max_parallel: int = 4,
+        install_timeout: float | None = 300,
+        deadline: float | None = None,
+        method: Literal["python", "docker"] = "python",
+        template: str | None = None,
+        resume: bool = False,
+    ) -> list[OperationResult[KherimoyaServer]]:
+        """
+        Creates many servers concurrently on a bounded pool of worker threads.
+
+        Args:
+            names (list[str]): Names for the new servers.
+            max_parallel (int = 4): Maximum number of servers being created at once.
+            install_timeout (float | None = 300): Per-server limit, see create_server.
+            deadline (float | None = None): Overall limit in seconds, servers not started by then fail with TimeoutError.
+            method (Literal["python", "docker"] = "python"): See create_server.
+            template (str | None = None): See create_server.
+            resume (bool = False): See create_server, e.g. to retry the failed servers of an earlier call.
+
+        Returns:
+            list[OperationResult[KherimoyaServer]]: One result per name (in order), holding either the new server or the error.
+
+        Example:
+            ```python
+            results = server_manager.create_servers([f"event{i}" for i in range(200)], max_parallel=8)
+            failed = [r for r in results if not r.ok]
+            ```
+        """
+        self._ensure_index()  # load once up front instead of racing to do it in every worker
+        self._ensure_ids()
+
+        results = run_bounded(
+            names,
+            lambda name: self.create_server(
+                name,
+                install_timeout=install_timeout,
+                method=method,
+                template=template,
+                resume=resume,
+            ),
+            max_parallel=max_parallel,
+            deadline=deadline,
+            thread_name_prefix="kherimoya-create",
+        )
+
+        failed = sum(1 for r in results if not r.ok)
+        self.logger.info(
+            f"Created {len(results) - failed}/{len(results)} servers ({failed} failed)"
+        )
+        return results
+
+    def start_servers(
+        self,
+        servers: Iterable[KherimoyaServer] | None = None,
+        max_booting: int = 4,
+        boot_timeout: float | None = 120,
+        deadline: float | None = None,
+        method: Literal["tmux", "supervisor"] = "tmux",
+        ping: bool = False,
+    ) -> list[OperationResult[KherimoyaServer]]:
+        """
+        Starts many servers concurrently, with at most `max_booting` of them booting at the same moment.
+
+        A server counts as booting until "Server started" appears in its console, so a node coming back from
+        maintenance doesn't have hundreds of Endstone processes loading their worlds at once. Servers which are already
+        running are left alone, and succeed right away.
+
+        Args:
+            servers (Iterable[KherimoyaServer] | None = None): The servers to start. If None, every stopped server except
+                the spares of the warm pool.
+            max_booting (int = 4): Maximum number of servers booting at once.
+            boot_timeout (float | None = 120): Per-server limit for booting, a server which takes longer fails with
+                TimeoutError (but keeps running). If None, wait as long as it takes.
+            deadline (float | None = None): Overall limit in seconds, servers not started by then fail with TimeoutError.
+            method (Literal["tmux", "supervisor"] = "tmux"): See KherimoyaServer._Actions.start_server.
+            ping (bool = False): Also confirm every server with a RakNet ping, see KherimoyaServer._Actions.start_server.
+
+        Returns:
+            list[OperationResult[KherimoyaServer]]: One result per server (in order, targets are server IDs), holding
+                either the booted server (see its boot_seconds) or the error.
+
+        Example:
+            ```python
+            results = server_manager.start_servers(max_booting=8, deadline=600)
+            failed = [r for r in results if not r.ok]
+            ```
+        """
+        if servers is None:
+            servers = [
+                server
+                for server in self.iter_servers(running=False)
+                if not is_spare_name(server.name)
+            ]
+        by_id = {server.server_id: server for server in servers}
+
+        def start(server_id: str) -> KherimoyaServer:
+            server = by_id[server_id]
+            if _server_running(server, method):
+                return server
+            server.actions.start_server(method, wait="ready", timeout=boot_timeout, ping=ping)
+            return server
+
+        # every worker holds its slot until its server booted, so the pool size is the boot limit
+        results = run_bounded(
+            list(by_id),
+            start,
+            max_parallel=max_booting,
+            deadline=deadline,
+            thread_name_prefix="kherimoya-start",
+        )
+
+        failed = sum(1 for r in results if not r.ok)
+        self.logger.info(
+            f"Started {len(results) - failed}/{len(results)} servers ({failed} failed)"
+        )
+        return results
+
+    def stop_servers(
+        self,
+        servers: Iterable[KherimoyaServer] | None = None,
+        max_parallel: int = 16,
+        grace: float | None = 60,
+        escalate: bool = True,
+        term_grace: float = 10,
+        deadline: float | None = None,
+        method: Literal["tmux", "supervisor"] = "tmux",
+    ) -> list[OperationResult[StopResult]]:
+        """
+        Stops many servers concurrently, waiting for each one to shut down (see KherimoyaServer._Actions.stop_server).
+
+        Every server is sent "stop" (through its tmux session, one write on the shared tmux connection, or the console
+        input of its supervised process), and counts as stopped once its session closed or its process exited.
+        Stragglers are sent SIGTERM and then SIGKILL, unless escalate is False. Servers which aren't running succeed
+        right away.
+
+        Args:
+            servers (Iterable[KherimoyaServer] | None = None): The servers to stop. If None, every running server.
+            max_parallel (int = 16): Maximum number of servers being stopped at once.
+            grace (float | None = 60): Seconds every server gets to shut down by itself, None to wait as long as it takes.
+            escalate (bool = True): Whether or not to signal servers still running after grace.
+            term_grace (float = 10): Seconds between SIGTERM and SIGKILL.
+            deadline (float | None = None): Overall limit in seconds, servers not stopped by then fail with TimeoutError.
+            method (Literal["tmux", "supervisor"] = "tmux"): See KherimoyaServer._Actions.stop_server.
+
+        Returns:
+            list[OperationResult[StopResult]]: One result per server (in order, targets are server IDs), holding either
+                how stopping it went or the error.
+
+        Example:
+            ```python
+            results = server_manager.stop_servers(grace=30, deadline=120)
+            killed = [r.target for r in results if r.ok and r.result.signal == "SIGKILL"]
+            ```
+        """
+        if servers is None:
+            servers = [
+                server
+                for server in self.list_server_objects()
+                if _server_running(server, method)
+            ]
+        by_id = {server.server_id: server for server in servers}
+
+        def stop(server_id: str) -> StopResult:
+            server = by_id[server_id]
+            try:
+                return server.actions.stop_server(
+                    method, wait=True, grace=grace, escalate=escalate, term_grace=term_grace
+                )
+            except exceptions.ServerNotRunningError:
+                return StopResult(exit_status=read_exit_status(server.path), seconds=0.0)
+
+        results = run_bounded(
+            list(by_id),
+            stop,
+            max_parallel=max_parallel,
+            deadline=deadline,
+            thread_name_prefix="kherimoya-stop",
+        )
+
+        failed = sum(1 for r in results if not r.ok)
+        escalated = sum(1 for r in results if r.ok and r.result.signal)
+        self.logger.info(
+            f"Stopped {len(results) - failed}/{len(results)} servers ({failed} failed, {escalated} had to be signalled)"
+        )
+        return results
 
     def delete_server(self, server: KherimoyaServer) -> None:
         """
@@ -810,7 +2154,9 @@ class ServerManager:
         if not server.exists or not server.path.is_dir():
             raise FileNotFoundError("Server does not exist")
 
+        old_path = self._relative_server_path(server.path)
         shutil.rmtree(server.path)
+        self._unregister(old_path)
 
     def rename_server(self, server: KherimoyaServer, new_name: str) -> None:
         """
@@ -828,7 +2174,11 @@ class ServerManager:
         """
         if not server.exists or not server.path.is_dir():
             raise FileNotFoundError("Server does not exist")
-        elif new_name in self.list_server_names() and self.strict_names:
+        elif is_spare_name(new_name):
+            raise exceptions.ServerRenameError(
+                f"Server names starting with '{SPARE_PREFIX}' are reserved for spare servers."
+            )
+        elif self.strict_names and self._name_taken(new_name):
             raise exceptions.ServerRenameError(
                 f"Server with name '{new_name}' already exists, and strict_names is enabled."
             )
@@ -847,8 +2197,140 @@ class ServerManager:
                 f"Server name cannot contain '-', ':', '/', '{DELIMITER}', or '\\' characters."
             )
 
-        new_path = (
-            server.path.parent / f"{new_name}{DELIMITER}{server.server_id}"
-        ).resolve()
-        server.path.rename(new_path)
-        server.refresh(new_path)  # refresh sets the name and id
+        with self._reserved_name(new_name, exceptions.ServerRenameError):
+            old_path = self._relative_server_path(server.path)
+            new_path = (
+                server.path.parent / f"{new_name}{DELIMITER}{server.server_id}"
+            ).resolve()
+            server.path.rename(new_path)
+            server.refresh(new_path)  # refresh sets the name and id
+            self._register(server, old_path=old_path)
+
+    def list_spare_servers(self) -> list[KherimoyaServer]:
+        """
+        Lists the stopped spare servers of the warm pool, which claim_server hands out.
+        """
+        return list(self.iter_servers(name_prefix=SPARE_PREFIX, running=False))
+
+    def claim_server(
+        self,
+        name: str,
+        install_timeout: float | None = 300,
+        template: str | None = None,
+    ) -> KherimoyaServer:
+        """
+        Gets a new server instantly by renaming a spare server of the warm pool to `name` (see rename_server). If there
+        are no spares left, a server is created as usual instead.
+
+        Args:
+            name (str): The name for the server.
+            install_timeout (float | None = 300): See create_server, only used when no spare is left.
+            template (str | None = None): See create_server, only used when no spare is left.
+
+        Returns:
+            KherimoyaServer: The new, existing server.
+
+        Example:
+            ```python
+            server_manager.start_warm_pool(size=5, template="lobby")
+            server = server_manager.claim_server("customer42")
+            ```
+        """
+        if is_spare_name(name):
+            raise exceptions.InvalidParameterError(
+                f"Server names starting with '{SPARE_PREFIX}' are reserved for spare servers."
+            )
+
+        try:
+            with self._claim_lock:  # the spare objects are shared, two claims must not rename the same one
+                for spare in self.list_spare_servers():
+                    if not is_spare_name(spare.name):
+                        continue
+                    try:
+                        self.rename_server(spare, name)
+                    except FileNotFoundError:
+                        # claimed by another process, which already moved it
+                        self._unregister(self._relative_server_path(spare.path))
+                        continue
+                    self.logger.info(f"Claimed spare server for '{name}': {spare.path.name}")
+                    return spare
+        finally:
+            if self._warm_pool is not None:
+                self._warm_pool.wake()
+
+        self.logger.info(f"No spare servers left, creating '{name}'")
+        return self.create_server(
+            name, install_timeout=install_timeout, template=template
+        )
+
+    def start_warm_pool(
+        self,
+        size: int,
+        template: str | None = None,
+        install_timeout: float | None = 300,
+        max_load: float = 0.75,
+        max_io_in_flight: int | None = None,
+    ) -> WarmPool:
+        """
+        Starts keeping `size` spare servers around for claim_server, refilled in the background while the machine is
+        below the CPU (and optionally I/O) budget. See WarmPool.
+
+        Returns:
+            WarmPool: The running pool.
+        """
+        self.stop_warm_pool()
+        self._warm_pool = WarmPool(
+            self,
+            size,
+            template=template,
+            install_timeout=install_timeout,
+            max_load=max_load,
+            max_io_in_flight=max_io_in_flight,
+        )
+        self._warm_pool.start()
+        return self._warm_pool
+
+    def stop_warm_pool(self) -> None:
+        """
+        Stops refilling the warm pool. Existing spares are kept.
+        """
+        if self._warm_pool is not None:
+            self._warm_pool.stop()
+            self._warm_pool = None
+
+    def dedup_servers(
+        self, servers: list[KherimoyaServer] | None = None, gc: bool = True
+    ) -> DedupReport:
+        """
+        Replaces identical immutable files (the BDS binary, libraries, behaviour/resource packs, ...) across servers with
+        hardlinks to one copy in the blob store.
+
+        Args:
+            servers (list[KherimoyaServer] | None = None): The servers to deduplicate. If None, every server.
+            gc (bool = True): Whether or not to also remove blobs no server uses anymore.
+
+        Returns:
+            DedupReport: Files linked and bytes saved.
+
+        Example:
+            ```python
+            report = server_manager.dedup_servers()
+            print(f"Saved {report.bytes_saved / 1e9:.1f} GB")
+            ```
+        """
+        if servers is None:
+            servers = self.list_server_objects()
+
+        report = self._blobs.dedup(
+            server.path / "server" for server in servers if (server.path / "server").is_dir()
+        )
+        if gc:
+            removed, _ = self._blobs.gc()
+            if removed:
+                self.logger.debug(f"Removed {removed} unused blobs")
+
+        self.logger.info(
+            f"Deduplicated {len(servers)} servers: {report.files_linked}/{report.files_scanned} files linked, "
+            f"{report.bytes_saved / 1e6:.1f} MB saved"
+        )
+        return report
@@ -0,0 +1,250 @@
+"""Running endstone directly as a supervised process, without tmux, a shell or a wrapper script in between."""
+
+import errno
+import os
+from pathlib import Path
+import select
+import signal
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+from .console import FINISHED_MARKER, ConsoleLog, console_log_path
+from .exceptions import ServerStartError
+
+PID_FILE = "endstone.pid"  # in a server's state/, "<pid> <start time>" of the running endstone
+STDIN_FIFO = "console.in"  # in a server's state/, what is written to it is endstone's console input
+EXIT_STATUS_FILE = "exit_status"  # in a server's state/, how the last run ended
+
+
+def _start_time(pid: int) -> str | None:
+    """
+    When a process started (in clock ticks since boot), which tells it apart from a later process with the same pid.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # the command name (field 2) may contain spaces, the fields after it don't
+    fields = data[data.rindex(b")") + 2 :].split()
+    if fields[0] == b"Z":
+        return None  # exited, just not reaped yet
+    return fields[19].decode()
+
+
+def read_exit_status(base_path: Path) -> int | None:
+    """
+    How the last run of a server's endstone ended (shell-style: 128 + the signal if it was killed), None if unknown or
+    it's still running.
+    """
+    try:
+        return int((base_path / "state" / EXIT_STATUS_FILE).read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return None
+
+
+class Supervisor:
+    """
+    Endstone of one server as a direct child process, in its own process group:
+
+    - stdin is a FIFO (state/console.in), so commands can be sent by any process, without blocking
+    - stdout and stderr go to state/console.log, the same log tmux streams to
+    - the pid (and its start time, against pid reuse) is kept in state/endstone.pid
+
+    While the starting process lives, a thread reaps endstone when it exits, records its exit status in
+    state/exit_status and ends the console log with FINISHED_MARKER, like _scripts/start_endstone.sh does.
+    """
+
+    _reapers: dict[int, threading.Thread] = {}  # pid -> reaper thread, of processes this process started
+
+    def __init__(self, base_path: Path) -> None:
+        self._base_path = base_path
+        self._state_path = base_path / "state"
+
+    @property
+    def pid_path(self) -> Path:
+        return self._state_path / PID_FILE
+
+    @property
+    def fifo_path(self) -> Path:
+        return self._state_path / STDIN_FIFO
+
+    @property
+    def console(self) -> ConsoleLog:
+        return ConsoleLog(console_log_path(self._base_path))
+
+    def _recorded(self) -> tuple[int, str] | None:
+        """
+        The pid and start time in the pid file, whether or not that process still runs.
+        """
+        try:
+            pid_text, started = self.pid_path.read_text(encoding="utf-8").split()
+            return int(pid_text), started
+        except (OSError, ValueError):
+            return None
+
+    def _join_reaper(self, timeout: float = 1.0) -> None:
+        """
+        Waits for this process' reaper of the last run (if any) to record how it ended.
+        """
+        recorded = self._recorded()
+        reaper = Supervisor._reapers.get(recorded[0]) if recorded else None
+        if reaper is not None:
+            reaper.join(timeout)
+
+    @property
+    def pid(self) -> int | None:
+        """
+        The pid of the running endstone, None if it isn't running.
+        """
+        recorded = self._recorded()
+        if recorded is None:
+            return None
+        pid, started = recorded
+        return pid if _start_time(pid) == started else None
+
+    @property
+    def running(self) -> bool:
+        return self.pid is not None
+
+    def _ensure_fifo(self) -> None:
+        try:
+            if stat.S_ISFIFO(self.fifo_path.stat().st_mode):
+                return
+            self.fifo_path.unlink()
+        except FileNotFoundError:
+            pass
+        os.mkfifo(self.fifo_path, 0o600)
+
+    def start(self, python: str = sys.executable) -> int:
+        """
+        Starts endstone.
+
+        Returns:
+            int: Its pid.
+
+        Raises:
+            ServerStartError: If it's already running, or couldn't be started.
+        """
+        if self.running:
+            raise ServerStartError(f"Endstone is already running for {self._base_path.name}")
+
+        self._join_reaper()  # or it could still end the new run's console log
+        self._state_path.mkdir(parents=True, exist_ok=True)
+        self._ensure_fifo()
+        console = self.console
+        console.create()
+
+        # read-write, so endstone never sees EOF when no one is writing and opening it never blocks
+        stdin_fd = os.open(self.fifo_path, os.O_RDWR)
+        try:
+            with open(console.path, "ab", buffering=0) as stdout:
+                process = subprocess.Popen(
+                    [python, "-m", "endstone", "-y", "-s", str(self._base_path / "server")],
+                    cwd=self._base_path / "server",
+                    stdin=stdin_fd,
+                    stdout=stdout,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,  # outlives Kherimoya, and can be signalled as a group
+                    env={**os.environ, "PYTHONUNBUFFERED": "1"},
+                )
+        except OSError as e:
+            raise ServerStartError(f"Failed to start endstone for {self._base_path.name}") from e
+        finally:
+            os.close(stdin_fd)
+
+        (self._state_path / EXIT_STATUS_FILE).unlink(missing_ok=True)
+        tmp = self.pid_path.with_name(f".{PID_FILE}.tmp")
+        tmp.write_text(f"{process.pid} {_start_time(process.pid)}\n", encoding="utf-8")
+        os.replace(tmp, self.pid_path)
+
+        reaper = threading.Thread(
+            target=self._reap, args=(process,), name=f"kherimoya-reap-{process.pid}", daemon=True
+        )
+        Supervisor._reapers[process.pid] = reaper
+        reaper.start()
+        return process.pid
+
+    def _reap(self, process: subprocess.Popen) -> None:
+        returncode = process.wait()
+        if returncode < 0:
+            returncode = 128 - returncode  # killed by a signal, recorded like start_endstone.sh's shell would
+        tmp = self._state_path / f".{EXIT_STATUS_FILE}.tmp"
+        tmp.write_text(f"{returncode}\n", encoding="utf-8")
+        os.replace(tmp, self._state_path / EXIT_STATUS_FILE)
+        with open(console_log_path(self._base_path), "a", encoding="utf-8") as f:
+            f.write(f"\n{FINISHED_MARKER}\n")
+        Supervisor._reapers.pop(process.pid, None)
+
+    def send(self, command: str) -> None:
+        """
+        Sends a console command (e.g. "stop") to endstone.
+
+        Raises:
+            ProcessLookupError: If endstone isn't running.
+        """
+        if not self.running:
+            raise ProcessLookupError(f"Endstone is not running for {self._base_path.name}")
+        try:
+            fd = os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # no reader, endstone exited just now
+                raise ProcessLookupError(f"Endstone is not running for {self._base_path.name}") from e
+            raise
+        try:
+            os.write(fd, f"{command}\n".encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def signal(self, sig: int = signal.SIGTERM) -> bool:
+        """
+        Signals endstone's process group.
+
+        Returns:
+            bool: False if endstone wasn't running.
+        """
+        pid = self.pid
+        if pid is None:
+            return False
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits for endstone to exit, woken up by a pidfd where there is one.
+
+        Returns:
+            bool: True once it exited, False on timeout.
+        """
+        pid = self.pid
+        if pid is None:
+            self._join_reaper()
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            pidfd = None
+        try:
+            while self.pid == pid:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if pidfd is not None:
+                    # readable once the process exits
+                    select.select([pidfd], [], [], remaining)
+                else:
+                    time.sleep(0.1 if remaining is None else min(remaining, 0.1))
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+        self._join_reaper()  # so the exit status is recorded once this returns
+        return True
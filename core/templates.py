@@ -0,0 +1,143 @@
+"""Golden templates: installed, pre-initialised servers which new servers are cloned from."""
+
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+
+from . import _fs
+from .cache import is_immutable
+
+# what gets copied from a server into a template (and from a template into a new server)
+TEMPLATE_SUBDIRS = ("config", "extra", "server")
+METADATA_FILE = "template.json"
+
+
+def _should_link(rel: str) -> bool:
+    subdir, _, rest = rel.partition("/")
+    return subdir == "server" and bool(rest) and is_immutable(rest)
+
+
+class TemplateStore:
+    """
+    Named templates under <project>/templates/<name>, each a snapshot of a stopped server's config/, extra/ and
+    server/ directories (optionally without its worlds), plus a template.json describing it.
+
+    Cloning hardlinks the immutable parts of the install (see cache.is_immutable) and reflinks everything else where
+    the filesystem supports it, so creating a server from a template takes well under a second and barely any disk.
+    """
+
+    def __init__(self, path: Path, logger: logging.Logger | None = None) -> None:
+        self._path = path
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def path_for(self, name: str) -> Path:
+        return self._path / name
+
+    def has(self, name: str) -> bool:
+        return (self.path_for(name) / METADATA_FILE).is_file()
+
+    def names(self) -> list[str]:
+        """
+        Lists the names of every template.
+        """
+        if not self._path.is_dir():
+            return []
+        return sorted(
+            entry.name
+            for entry in os.scandir(self._path)
+            if entry.is_dir() and not entry.name.startswith(".") and self.has(entry.name)
+        )
+
+    def metadata(self, name: str) -> dict:
+        with open(self.path_for(name) / METADATA_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(
+        self,
+        name: str,
+        server_path: Path,
+        include_world: bool = True,
+        overwrite: bool = False,
+        **metadata,
+    ) -> Path:
+        """
+        Snapshots a (stopped) server directory as a template.
+
+        Args:
+            name (str): Name of the template.
+            server_path (Path): The server directory (e.g. servers/name@id) to snapshot.
+            include_world (bool = True): Whether or not to keep the server's worlds/ in the template.
+            overwrite (bool = False): Whether or not to replace an existing template with the same name.
+            **metadata: Extra values to store in template.json.
+
+        Returns:
+            Path: The template's directory.
+        """
+        if not name or name.startswith(".") or "/" in name or "\\" in name:
+            raise ValueError(f"Invalid template name: {name!r}")
+        target = self.path_for(name)
+        if self.has(name) and not overwrite:
+            raise FileExistsError(f"Template '{name}' already exists")
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        tmp = self._path / f".{name}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            for subdir in TEMPLATE_SUBDIRS:
+                source = server_path / subdir
+                if source.is_dir():
+                    _fs.clone_tree(
+                        source,
+                        tmp / subdir,
+                        should_link=lambda rel: subdir == "server" and is_immutable(rel),
+                        skip=lambda rel: subdir == "server"
+                        and not include_world
+                        and rel.partition("/")[0] == "worlds",
+                    )
+
+            metadata.update(
+                name=name,
+                source=server_path.name,
+                include_world=include_world,
+                created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            )
+            with open(tmp / METADATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=4)
+
+            if target.exists():
+                shutil.rmtree(target)
+            os.rename(tmp, target)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self.logger.info(f"Saved template '{name}' from {server_path}")
+        return target
+
+    def clone_into(self, name: str, base_path: Path) -> tuple[int, int]:
+        """
+        Clones a template into a (new) server directory.
+
+        Returns:
+            tuple[int, int]: Bytes which were hardlinked, and bytes which were copied (or reflinked).
+        """
+        if not self.has(name):
+            raise FileNotFoundError(f"Template '{name}' does not exist")
+        return _fs.clone_tree(
+            self.path_for(name),
+            base_path,
+            should_link=_should_link,
+            skip=lambda rel: rel == METADATA_FILE,
+        )
+
+    def remove(self, name: str) -> None:
+        """
+        Removes a template. Servers cloned from it are not affected.
+        """
+        shutil.rmtree(self.path_for(name), ignore_errors=True)
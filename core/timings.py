@@ -0,0 +1,58 @@
+"""Monotonic stage timers, used to tell where the time of server creation goes."""
+
+import time
+from typing import Callable
+
+MetricsSink = Callable[[str, dict], None]  # (event name, record)
+
+
+class StageTimer:
+    """
+    Times consecutive stages: starting a stage ends the previous one.
+
+    Example:
+        ```python
+        timer = StageTimer()
+        timer.start("mkdir")
+        ...
+        timer.start("tmux_spawn")
+        ...
+        timer.stop()
+        timer.stages  # {"mkdir": 0.001, "tmux_spawn": 0.042}
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._stages: dict[str, float] = {}
+        self._current: str | None = None
+        self._current_start = 0.0
+        self._start = time.monotonic()
+        self._end: float | None = None
+
+    def start(self, stage: str) -> None:
+        now = time.monotonic()
+        self._finish(now)
+        self._current = stage
+        self._current_start = now
+
+    def _finish(self, now: float) -> None:
+        if self._current is not None:
+            # a stage which is started twice adds up
+            self._stages[self._current] = self._stages.get(self._current, 0.0) + (now - self._current_start)
+            self._current = None
+
+    def stop(self) -> None:
+        now = time.monotonic()
+        self._finish(now)
+        self._end = now
+
+    @property
+    def stages(self) -> dict[str, float]:
+        """
+        Seconds spent in every finished stage, in the order they were started.
+        """
+        return dict(self._stages)
+
+    @property
+    def total(self) -> float:
+        return (self._end if self._end is not None else time.monotonic()) - self._start
@@ -0,0 +1,344 @@
+"""
+A long-lived tmux control mode (tmux -C) connection, shared by every server operation of a process.
+
+Every command is one line written to the connection, and its reply is matched up by order, so running a command costs
+no fork. The session list is cached and only fetched again after tmux reports that sessions changed, which is also how
+waiting for a session to close works without polling.
+"""
+
+import logging
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable
+
+from .exceptions import TmuxError
+
+CONTROL_SESSION = "_kherimoya-control"  # what the control client is attached to; never listed as a server session
+DEFAULT_SHELL = "/bin/bash"
+
+
+def quote(arg: str) -> str:
+    """
+    Quotes an argument for the tmux command parser.
+    """
+    if "\n" in arg or "\r" in arg:
+        raise ValueError("tmux arguments can not contain newlines")
+    if arg and all(c.isalnum() or c in "-_./=:@%+," for c in arg):
+        return arg
+    return '"' + arg.replace("\\", "\\\\").replace('"', '\\"').replace("$", "\\$") + '"'
+
+
+def session_name(name: str) -> str:
+    """
+    The name tmux gives a session requested as `name` (it replaces "." and ":").
+    """
+    return name.replace(".", "_").replace(":", "_")
+
+
+def exact(name: str) -> str:
+    """
+    A target for exactly the session `name`; plain names also match sessions which merely start with them.
+    """
+    return f"={session_name(name)}"
+
+
+class TmuxControl:
+    """
+    One tmux control mode client, attached to a hidden session (which tmux removes again once no client is attached).
+    """
+
+    def __init__(self, socket_name: str | None = None, tmux: str = "tmux", logger: logging.Logger | None = None) -> None:
+        """
+        Args:
+            socket_name (str | None = None): tmux socket name (tmux -L), None for the default server.
+            tmux (str = "tmux"): The tmux executable.
+        """
+        self._socket_name = socket_name
+        self._tmux = tmux
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._process: subprocess.Popen | None = None
+        self._reader: threading.Thread | None = None
+        self._write_lock = threading.Lock()
+        self._pending: list[Future] = []  # replies arrive in the order commands were written
+        self._alive = False
+        self._attached = threading.Event()  # set once the client's own new-session ran, commands may go out from then
+        self._pid = os.getpid()
+
+        self._changed = threading.Condition()
+        self._generation = 0  # bumped on every %sessions-changed
+        self._sessions: set[str] | None = None
+        self._sessions_generation = -1
+
+    # --- connection --- #
+
+    @property
+    def alive(self) -> bool:
+        return self._alive and self._pid == os.getpid()
+
+    def start(self, timeout: float = 10) -> None:
+        """
+        Connects to tmux (starting its server if needed).
+
+        Raises:
+            TmuxError: If tmux couldn't be attached to within timeout.
+        """
+        argv = [self._tmux]
+        if self._socket_name:
+            argv += ["-L", self._socket_name]
+        argv += ["-C", "new-session", "-A", "-s", CONTROL_SESSION, "tail -f /dev/null"]
+
+        self._process = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # a Ctrl+C meant for us shouldn't kill the connection first
+        )
+        self._alive = True
+        self._reader = threading.Thread(target=self._read_loop, name="kherimoya-tmux", daemon=True)
+        self._reader.start()
+
+        # commands written before the client's own new-session ran could run first, against a session which doesn't
+        # exist yet (with a tmux server already running, it reads stdin that early)
+        if not self._attached.wait(timeout) or not self._alive:
+            self.close()
+            raise TmuxError("Failed to attach to tmux")
+
+        self.command("set-option", "-t", CONTROL_SESSION, "destroy-unattached", "on")  # set-option takes no "=" targets
+        self.command("set-option", "-g", "default-shell", DEFAULT_SHELL)
+
+    def close(self) -> None:
+        """
+        Detaches from tmux. Server sessions are not affected.
+        """
+        process = self._process
+        self._alive = False
+        if process is None:
+            return
+        try:
+            if process.stdin:
+                process.stdin.close()  # an empty line / EOF detaches a control client
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        self._process = None
+
+    def _read_loop(self) -> None:
+        assert self._process is not None and self._process.stdout is not None
+        block: list[str] | None = None
+        ours = False
+
+        for raw in self._process.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip("\n")
+
+            if block is not None:
+                if line.startswith(("%end ", "%error ")):
+                    if ours:
+                        self._resolve(line.startswith("%error "), block)
+                    else:
+                        self._attached.set()  # the attach's own new-session, which comes before anything of ours
+                    block = None
+                else:
+                    block.append(line)
+                continue
+
+            if line.startswith("%begin "):
+                # flags 1 means the command came from this client, anything else (e.g. the initial attach) isn't ours
+                ours = line.split(" ")[3:4] == ["1"]
+                block = []
+            elif line.startswith("%sessions-changed"):
+                with self._changed:
+                    self._generation += 1
+                    self._changed.notify_all()
+            elif line.startswith("%exit"):
+                break
+
+        self._alive = False
+        self._attached.set()  # wakes up start(), which then sees the connection is gone
+        with self._write_lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.set_exception(TmuxError("tmux control connection closed"))
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def _resolve(self, error: bool, output: list[str]) -> None:
+        with self._write_lock:
+            if not self._pending:
+                return
+            future = self._pending.pop(0)
+        if error:
+            future.set_exception(TmuxError("\n".join(output) or "tmux command failed"))
+        else:
+            future.set_result(output)
+
+    # --- commands --- #
+
+    def send(self, *args: str) -> Future:
+        """
+        Writes a command without waiting for its reply.
+
+        Returns:
+            Future: Resolves to the command's output lines, or raises TmuxError.
+        """
+        line = " ".join(quote(str(arg)) for arg in args) + "\n"
+        future: Future = Future()
+        with self._write_lock:
+            if not self.alive or self._process is None or self._process.stdin is None:
+                raise TmuxError("tmux control connection is not running")
+            self._pending.append(future)
+            try:
+                self._process.stdin.write(line.encode("utf-8"))
+                self._process.stdin.flush()
+            except OSError as e:
+                self._pending.remove(future)
+                raise TmuxError("tmux control connection closed") from e
+        return future
+
+    def command(self, *args: str, timeout: float | None = 10) -> list[str]:
+        """
+        Runs a tmux command and returns its output lines.
+
+        Raises:
+            TmuxError: If tmux reports an error, or the connection is gone.
+        """
+        return self.send(*args).result(timeout)
+
+    def commands(self, commands: Iterable[tuple[str, ...]], timeout: float | None = 10) -> list[list[str] | TmuxError]:
+        """
+        Runs many commands, all written before waiting for any reply (e.g. a stop for every server at once).
+
+        Returns:
+            list[list[str] | TmuxError]: The output of every command, or the error it failed with.
+        """
+        futures = [self.send(*command) for command in commands]
+        results: list[list[str] | TmuxError] = []
+        end = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            try:
+                results.append(future.result(None if end is None else max(0.0, end - time.monotonic())))
+            except TmuxError as e:
+                results.append(e)
+        return results
+
+    # --- sessions --- #
+
+    def sessions(self) -> set[str]:
+        """
+        Names of every session (except the control session). Cached until tmux reports a change.
+        """
+        with self._changed:
+            generation = self._generation
+            if self._sessions is not None and self._sessions_generation == generation:
+                return set(self._sessions)
+        names = set(self.command("list-sessions", "-F", "#{session_name}"))
+        names.discard(CONTROL_SESSION)
+        with self._changed:
+            self._sessions = names
+            self._sessions_generation = generation
+        return set(names)
+
+    def has_session(self, name: str) -> bool:
+        return session_name(name) in self.sessions()
+
+    def new_session(self, name: str, command: str, start_directory: str | None = None) -> None:
+        """
+        Creates a detached session running `command`.
+        """
+        args = ["new-session", "-d", "-s", name]
+        if start_directory is not None:
+            args += ["-c", start_directory]
+        self.command(*args, command)
+
+    def kill_session(self, name: str) -> bool:
+        """
+        Kills a session if it exists.
+
+        Returns:
+            bool: False if there was no such session.
+        """
+        if not self.has_session(name):
+            return False
+        try:
+            self.command("kill-session", "-t", exact(name))
+        except TmuxError:
+            return False  # closed in the meantime
+        return True
+
+    def send_keys(self, name: str, keys: str, enter: bool = True) -> None:
+        """
+        Types `keys` (literally) into the first pane of a session.
+        """
+        target = exact(name) + ":"
+        self.command("send-keys", "-t", target, "-l", keys)
+        if enter:
+            self.command("send-keys", "-t", target, "Enter")
+
+    def pane_pid(self, name: str) -> int | None:
+        """
+        The pid of the process running in the first pane of a session (the leader of its process group), None if there
+        is no such session.
+        """
+        try:
+            output = self.command("display-message", "-p", "-t", exact(name) + ":", "#{pane_pid}")
+        except TmuxError:
+            return None
+        return int(output[0]) if output and output[0].isdigit() else None
+
+    def pipe_pane(self, name: str, shell_command: str) -> None:
+        """
+        Pipes the output of the first pane of a session into `shell_command`.
+        """
+        self.command("pipe-pane", "-o", "-t", exact(name) + ":", shell_command)
+
+    def wait_session_closed(self, name: str, timeout: float | None = None) -> bool:
+        """
+        Waits for a session to close, woken up by tmux's session change notifications.
+
+        Returns:
+            bool: True if the session is gone, False on timeout.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._changed:
+                generation = self._generation
+            if not self.has_session(name):
+                return True
+            if not self.alive:
+                raise TmuxError("tmux control connection closed")
+            remaining = None if end is None else end - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            with self._changed:
+                self._changed.wait_for(lambda: self._generation != generation, remaining)
+
+
+_control: TmuxControl | None = None
+_control_lock = threading.Lock()
+
+
+def get_control() -> TmuxControl:
+    """
+    The tmux connection of this process, (re)connecting if needed (e.g. after the tmux server exited, or a fork).
+    """
+    global _control
+    with _control_lock:
+        if _control is None or not _control.alive:
+            if _control is not None and _control._pid == os.getpid():
+                _control.close()
+            _control = TmuxControl()
+            try:
+                _control.start()
+            except BaseException:
+                _control.close()
+                _control = None  # half-started, the next call connects again
+                raise
+        return _control
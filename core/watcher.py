@@ -0,0 +1,267 @@
+"""Change feed for the servers/ directory, driven by Linux inotify."""
+
+from dataclasses import dataclass
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Callable
+
+from . import _inotify
+from .constants import DELIMITER
+from .layout import is_shard_name
+
+
+@dataclass(frozen=True)
+class ServerEvent:
+    """
+    Base class for changes to servers/. `path` is relative to servers/, like RegistryEntry.path.
+    """
+
+    name: str
+    server_id: str
+    path: str
+
+
+@dataclass(frozen=True)
+class ServerCreatedEvent(ServerEvent):
+    """A server directory appeared in servers/ (created, copied or moved in)."""
+
+
+@dataclass(frozen=True)
+class ServerDeletedEvent(ServerEvent):
+    """A server directory disappeared from servers/ (deleted or moved out)."""
+
+
+@dataclass(frozen=True)
+class ServerRenamedEvent(ServerEvent):
+    """A server directory was renamed within servers/."""
+
+    old_name: str
+    old_server_id: str
+    old_path: str
+
+
+def _split(path: str) -> tuple[str, str] | None:
+    dirname = path.rsplit("/", 1)[-1]
+    if DELIMITER not in dirname:
+        return None  # not a server
+    name, server_id = dirname.split(DELIMITER, 1)
+    return name, server_id
+
+
+class ServerWatcher:
+    """
+    Watches servers/ (and its shard directories, see core.layout) in a background thread and emits ServerEvents.
+
+    Use ServerManager.watch to get one which also keeps the manager's registry and caches up to date.
+    """
+
+    _MASK = (
+        _inotify.IN_CREATE
+        | _inotify.IN_DELETE
+        | _inotify.IN_MOVED_FROM
+        | _inotify.IN_MOVED_TO
+        | _inotify.IN_DELETE_SELF
+        | _inotify.IN_MOVE_SELF
+        | _inotify.IN_ONLYDIR
+    )
+
+    # how long to wait for the IN_MOVED_TO half of a rename before treating it as a move out of servers/
+    _MOVE_PAIR_TIMEOUT = 0.05
+
+    def __init__(
+        self,
+        servers_path: Path,
+        callback: Callable[[ServerEvent], None],
+        on_overflow: Callable[[], None] | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        """
+        Args:
+            servers_path (Path): The servers/ directory to watch.
+            callback (Callable[[ServerEvent], None]): Called from the watcher thread for every event.
+            on_overflow (Callable[[], None] | None = None): Called if the kernel dropped events, meaning everything has to be rescanned.
+        """
+        self._servers_path = servers_path
+        self._callback = callback
+        self._on_overflow = on_overflow
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._inotify: _inotify.Inotify | None = None
+        self._watches: dict[int, str] = {}  # wd -> directory relative to servers/ ("" for servers/ itself)
+        self._root_wd = -1
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts watching. Raises OSError if inotify isn't available (i.e. not on Linux).
+        """
+        if self.running:
+            return
+        self._servers_path.mkdir(parents=True, exist_ok=True)
+
+        self._inotify = _inotify.Inotify()
+        self._watches = {}
+        self._root_wd = self._watch("")
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="kherimoya-watcher", daemon=True
+        )
+        self._thread.start()
+        self.logger.info(f"Watching for server changes in {self._servers_path}")
+
+    def stop(self, timeout: float | None = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "ServerWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- event handling --- #
+
+    def _watch(self, prefix: str) -> int:
+        """
+        Watches a directory (relative to servers/) and, for shard directories, the shards inside of it.
+        """
+        assert self._inotify is not None
+        path = self._servers_path / prefix if prefix else self._servers_path
+        wd = self._inotify.add_watch(path, self._MASK)
+        self._watches[wd] = prefix
+
+        depth = prefix.count("/") + 1 if prefix else 0
+        if depth < 2:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir() and is_shard_name(entry.name):
+                        self._watch(f"{prefix}/{entry.name}" if prefix else entry.name)
+        return wd
+
+    def _watch_new_shard(self, prefix: str) -> None:
+        """
+        Starts watching a newly created shard directory. Servers may have been put in it before the watch was added,
+        so those are emitted as created.
+        """
+        try:
+            self._watch(prefix)
+        except OSError:
+            return  # already gone
+
+        depth = prefix.count("/") + 1
+        shards = [prefix] if depth == 2 else [
+            f"{prefix}/{d.name}" for d in os.scandir(self._servers_path / prefix)
+            if d.is_dir() and is_shard_name(d.name)
+        ]
+        for shard in shards:
+            with os.scandir(self._servers_path / shard) as it:
+                for entry in it:
+                    if entry.is_dir() and (split := _split(entry.name)) is not None:
+                        self._emit(
+                            ServerCreatedEvent(*split, path=f"{shard}/{entry.name}")
+                        )
+
+    def _emit(self, event: ServerEvent) -> None:
+        self.logger.debug(f"Server event: {event}")
+        try:
+            self._callback(event)
+        except Exception:
+            self.logger.exception(f"Server event callback failed for {event}")
+
+    def _run(self) -> None:
+        inotify = self._inotify
+        assert inotify is not None
+        pending_moves: dict[int, str] = {}  # cookie -> old dirname
+
+        while not self._stop.is_set():
+            events = inotify.read(
+                self._MOVE_PAIR_TIMEOUT if pending_moves else 0.5
+            )
+
+            if not events:
+                # the other half of these moves never came, so they were moved out of servers/
+                for dirname in pending_moves.values():
+                    if (split := _split(dirname)) is not None:
+                        self._emit(ServerDeletedEvent(*split, path=dirname))
+                pending_moves.clear()
+                continue
+
+            for event in events:
+                if event.mask & _inotify.IN_Q_OVERFLOW:
+                    self.logger.warning(
+                        "inotify event queue overflowed, some server changes were missed"
+                    )
+                    pending_moves.clear()
+                    if self._on_overflow is not None:
+                        self._on_overflow()
+                    continue
+
+                if event.mask & (
+                    _inotify.IN_DELETE_SELF | _inotify.IN_MOVE_SELF | _inotify.IN_IGNORED
+                ):
+                    if event.wd != self._root_wd:
+                        if event.mask & _inotify.IN_IGNORED:
+                            self._watches.pop(event.wd, None)  # a shard directory was removed
+                        continue
+                    self.logger.warning(
+                        f"{self._servers_path} was removed or moved, no longer watching it"
+                    )
+                    self._stop.set()
+                    break
+
+                if not event.mask & _inotify.IN_ISDIR or event.wd not in self._watches:
+                    continue
+
+                prefix = self._watches[event.wd]
+                path = f"{prefix}/{event.name}" if prefix else event.name
+                split = _split(path)
+
+                if (
+                    split is None
+                    and prefix.count("/") < 1
+                    and is_shard_name(event.name)
+                    and event.mask & (_inotify.IN_CREATE | _inotify.IN_MOVED_TO)
+                ):
+                    self._watch_new_shard(path)
+                    continue
+
+                if event.mask & _inotify.IN_MOVED_FROM:
+                    pending_moves[event.cookie] = path
+                elif event.mask & _inotify.IN_MOVED_TO:
+                    old_dirname = pending_moves.pop(event.cookie, "")
+                    old_split = _split(old_dirname)
+                    if old_split is not None and split is not None:
+                        self._emit(
+                            ServerRenamedEvent(
+                                *split,
+                                path=path,
+                                old_name=old_split[0],
+                                old_server_id=old_split[1],
+                                old_path=old_dirname,
+                            )
+                        )
+                    elif old_split is not None:
+                        # renamed into something which isn't a server anymore
+                        self._emit(ServerDeletedEvent(*old_split, path=old_dirname))
+                    elif split is not None:
+                        self._emit(ServerCreatedEvent(*split, path=path))
+                elif split is None:
+                    continue
+                elif event.mask & _inotify.IN_CREATE:
+                    self._emit(ServerCreatedEvent(*split, path=path))
+                elif event.mask & _inotify.IN_DELETE:
+                    self._emit(ServerDeletedEvent(*split, path=path))
@@ -0,0 +1,138 @@
+"""
+Counts the filesystem work done by listing servers
+
+Compares the old listing (walk servers/, build every KherimoyaServer and call refresh on it, which rewrote server.json
+every time) with the registry backed, read-only list_server_objects.
+
+File opens, writes and directory listings are counted with audit hooks. If strace is installed, every scenario is also
+run under `strace -c -f` to get the total number of syscalls.
+
+Example:
+    ```shell
+    $ python scripts/benchmarks/list_servers_syscalls.py --servers 2000
+    ```
+"""
+
+import argparse
+import json
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_PATH))
+
+from core.constants import DELIMITER  # noqa: E402
+from core.servers import ServerManager, KherimoyaServer  # noqa: E402
+
+SCENARIOS = ["legacy", "cold", "warm"]
+
+
+def make_project(servers: int) -> Path:
+    """Makes a throwaway project with `servers` fake (empty) servers."""
+    project = Path(tempfile.mkdtemp(prefix="kherimoya-bench-"))
+    for i in range(servers):
+        base_path = project / "servers" / f"bench{i}{DELIMITER}{i:04x}"
+        (base_path / "state").mkdir(parents=True)
+        with open(base_path / "server.json", "w", encoding="utf-8") as f:
+            json.dump({"name": f"bench{i}", "id": f"{i:04x}"}, f, indent=4)
+    return project
+
+
+def legacy_list(project: Path) -> int:
+    """
+    The listing as it was before the registry: a directory walk, plus a server.json write per server.
+
+    The old refresh is reproduced here rather than called, as refresh now reads server.json and skips unchanged writes.
+    """
+    count = 0
+    for p in (project / "servers").iterdir():
+        if not p.is_dir() or DELIMITER not in p.name:
+            continue
+        KherimoyaServer(project_path=project, name=p.name)  # built for every server, as the old listing did
+        # the old refresh stat'ed the directory three times, then wrote server.json unconditionally
+        p.is_dir()  # refresh: `if not path.is_dir()`, returning early if the server's path went away
+        p.is_dir()  # refresh: `if not path.is_dir()`, raising FileNotFoundError
+        p.is_dir()  # refresh: `if not self._path.is_dir()`, setting exists
+        name, server_id = p.name.split(DELIMITER, 1)
+        with open(p / "server.json", "w", encoding="utf-8") as f:
+            json.dump({"name": name, "id": server_id}, f, indent=4)
+        count += 1
+    return count
+
+
+def run_scenario(scenario: str, project: Path) -> dict:
+    manager = ServerManager(project, log_level=40)  # the registry was already built by main()
+    if scenario == "warm":
+        manager.list_server_objects()  # fills the identity map
+
+    counts = {"open_read": 0, "open_write": 0, "listdir": 0}
+
+    def hook(event, args):
+        if event == "open":
+            mode = args[1] or "r"
+            if isinstance(mode, str) and any(c in mode for c in "wax+"):
+                counts["open_write"] += 1
+            else:
+                counts["open_read"] += 1
+        elif event in ("os.scandir", "os.listdir"):
+            counts["listdir"] += 1
+
+    sys.addaudithook(hook)  # audit hooks can't be removed, so each scenario runs in its own process
+    start = time.perf_counter()
+    if scenario == "legacy":
+        servers = legacy_list(project)
+    else:
+        servers = len(manager.list_server_objects())
+    elapsed = time.perf_counter() - start
+    return {"scenario": scenario, "servers": servers, "seconds": round(elapsed, 4), **counts}
+
+
+def strace_total(scenario: str, project: Path) -> int | None:
+    if shutil.which("strace") is None:
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".strace") as out:
+        subprocess.run(
+            ["strace", "-f", "-c", "-o", out.name, sys.executable, __file__, "--child", scenario, "--project", str(project)],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        for line in Path(out.name).read_text().splitlines():
+            if line.strip().endswith("total"):
+                return int(line.split()[3])
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Counts the syscalls done by listing servers")
+    parser.add_argument("--servers", type=int, default=2000, help="Number of fake servers to list")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--project", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.project)))
+        return
+
+    project = make_project(args.servers)
+    ServerManager(project, log_level=40).rebuild_registry()
+    try:
+        for scenario in SCENARIOS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", scenario, "--project", str(project)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["syscalls"] = strace_total(scenario, project)
+            print(", ".join(f"{k}={v}" for k, v in result.items()))
+    finally:
+        shutil.rmtree(project, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()